@@ -0,0 +1,145 @@
+import heapq
+import numpy as np
+from scipy.sparse.csgraph import dijkstra
+from kernels import reconstruct_path
+
+
+class _SearchState(object):
+    """ Shared state for all spur searches of one k-shortest-paths query.
+        Holds a symmetric copy of the graph whose edge weights are masked in place (set to inf) during a spur
+        search and restored afterwards, together with the shortest-path tree rooted in the end node.
+
+    :param graph: Matrix with all indices and distances
+    :param end_node: The city all paths should end in
+    """
+
+    def __init__(self, graph, end_node):
+        self.graph = (graph + graph.T).tocsr()
+        self.graph.sort_indices()
+        self.end_node = end_node
+        self.dist_to_end, self.pred_to_end = dijkstra(self.graph, indices=end_node, return_predecessors=True)
+        self.masked = []
+
+    def edge_position(self, u, v):
+        """ Returns the position of edge u -> v in the data array of the graph """
+        start, stop = self.graph.indptr[u], self.graph.indptr[u + 1]
+        return start + np.searchsorted(self.graph.indices[start:stop], v)
+
+    def edge_weight(self, u, v):
+        return self.graph.data[self.edge_position(u, v)]
+
+    def path_length(self, sequence):
+        return sum(self.edge_weight(u, v) for u, v in zip(sequence[:-1], sequence[1:]))
+
+    def mask_edge(self, u, v):
+        position = self.edge_position(u, v)
+        self.masked.append((slice(position, position + 1), self.graph.data[position:position + 1].copy()))
+        self.graph.data[position] = np.inf
+
+    def mask_node(self, u):
+        """ Masks all edges leaving u, which means that no path can pass through u """
+        rows = slice(self.graph.indptr[u], self.graph.indptr[u + 1])
+        self.masked.append((rows, self.graph.data[rows].copy()))
+        self.graph.data[rows] = np.inf
+
+    def restore(self):
+        for positions, weights in reversed(self.masked):
+            self.graph.data[positions] = weights
+        self.masked = []
+
+    def tree_path(self, node):
+        """ Returns the path from node to the end node in the shortest-path tree, or None if there is none """
+        if np.isinf(self.dist_to_end[node]):
+            return None
+        return reconstruct_path(self.pred_to_end, self.end_node, node)[::-1].tolist()
+
+    def spur_path(self, spur_node, removed_nodes, removed_edges, limit=np.inf):
+        """ Finds the shortest path from spur_node to the end node that avoids removed_nodes and removed_edges.
+            The precomputed tree path is used directly when it avoids everything that is removed,
+            otherwise a new search, bounded by limit, is made on the masked graph.
+
+        :return: spur distance and sequence, or None if the end node can't be reached
+        """
+        tree_path = self.tree_path(spur_node)
+        if tree_path is not None and len(tree_path) > 1 and (spur_node, tree_path[1]) not in removed_edges \
+                and removed_nodes.isdisjoint(tree_path[1:]):
+            return self.dist_to_end[spur_node], tree_path
+
+        for u in removed_nodes:
+            self.mask_node(u)
+        for u, v in removed_edges:
+            self.mask_edge(u, v)
+        dist, predecessors = dijkstra(self.graph, indices=spur_node, return_predecessors=True, limit=limit)
+        self.restore()
+
+        if np.isinf(dist[self.end_node]):
+            return None
+        return dist[self.end_node], reconstruct_path(predecessors, spur_node, self.end_node).tolist()
+
+
+def _overlap(state, sequence, other_edges):
+    """ Fraction of the length of sequence that is also travelled on the path given by other_edges """
+    total = 0
+    shared = 0
+    for u, v in zip(sequence[:-1], sequence[1:]):
+        weight = state.edge_weight(u, v)
+        total += weight
+        if (u, v) in other_edges or (v, u) in other_edges:
+            shared += weight
+    return shared / total if total > 0 else 1
+
+
+def find_alternative_paths(graph, start_node, end_node, k=3, max_overlap=0.8, max_stretch=1.5, max_candidates=None):
+    """ Finds the shortest path and up to k - 1 alternative loopless paths between two cities with Yen's algorithm.
+        Alternatives that share more than max_overlap of their length with an already chosen path are dropped,
+        and alternatives longer than max_stretch times the shortest path are never searched for.
+
+    :param graph: Matrix with all indices and distances
+    :param start_node: The city the paths should start from
+    :param end_node: The city the paths should end in
+    :param k: number of paths to return, including the shortest one
+    :param max_overlap: largest allowed shared length fraction between an alternative and a chosen path
+    :param max_stretch: largest allowed ratio between the length of an alternative and the shortest path
+    :param max_candidates: maximum number of loopless paths examined, defaults to 20 * k
+    :return: list of (dist, sequence) sorted by distance, the first entry is the shortest path
+    """
+    if max_candidates is None:
+        max_candidates = 20 * k
+
+    state = _SearchState(graph, end_node)
+    first = state.tree_path(start_node)
+    if first is None:
+        return []
+
+    max_length = max_stretch * state.dist_to_end[start_node]
+    accepted = [(state.dist_to_end[start_node], first)]
+    accepted_edges = [set(zip(first[:-1], first[1:]))]
+    found = [first]
+    candidates = []
+    seen = {tuple(first)}
+
+    while len(accepted) < k and len(found) < max_candidates:
+        previous = found[-1]
+        for i in range(len(previous) - 1):
+            spur_node = previous[i]
+            root = previous[:i + 1]
+            removed_edges = {(p[i], p[i + 1]) for p in found if len(p) > i + 1 and p[:i + 1] == root}
+            removed_edges |= {(v, u) for u, v in removed_edges}
+            root_length = state.path_length(root)
+            spur = state.spur_path(spur_node, set(root[:-1]), removed_edges, limit=max_length - root_length)
+            if spur is None:
+                continue
+            sequence = root[:-1] + spur[1]
+            if tuple(sequence) not in seen:
+                seen.add(tuple(sequence))
+                heapq.heappush(candidates, (root_length + spur[0], sequence))
+
+        if not candidates:
+            break
+        dist, sequence = heapq.heappop(candidates)
+        found.append(sequence)
+        if all(_overlap(state, sequence, edges) <= max_overlap for edges in accepted_edges):
+            accepted.append((dist, sequence))
+            accepted_edges.append(set(zip(sequence[:-1], sequence[1:])))
+
+    return accepted
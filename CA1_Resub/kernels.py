@@ -0,0 +1,163 @@
+"""Compiled kernels for the hot loops in main.py.
+
+Numba is used when it is installed, the compiled functions are cached on disk so only the first run pays for the
+compilation. Without Numba the same functions are provided as NumPy implementations with identical output.
+"""
+import numpy as np
+
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+
+
+def _pair_connections_numpy(coords, radius, block_size=1024):
+    """ Finds all pairs i < j with a distance of at most radius by comparing blocks of points against each other
+
+    :param coords: point coordinates with shape (n, 2)
+    :param radius: allowed distance between cities to make a connection
+    :param block_size: number of rows compared at once, limits memory to a few arrays of block_size * n values
+    :return: city_1, city_2 and distance arrays
+    """
+    n = len(coords)
+    city_1 = []
+    city_2 = []
+    distance = []
+    for start in range(0, n, block_size):
+        block = coords[start:start + block_size]
+        # The x and y differences are separate (block, n) arrays, a (block, n, 2) array would double the memory
+        dx = block[:, None, 0] - coords[None, :, 0]
+        dy = block[:, None, 1] - coords[None, :, 1]
+        dist = np.sqrt(dx * dx + dy * dy)
+        i, j = np.nonzero(dist <= radius)
+        i += start
+        keep = i < j
+        city_1.append(i[keep])
+        city_2.append(j[keep])
+        distance.append(dist[i[keep] - start, j[keep]])
+    if n == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+    return np.concatenate(city_1), np.concatenate(city_2), np.concatenate(distance)
+
+
+def _assemble_edges_numpy(coords, neighbours, offsets):
+    """ Turns the flattened neighbour lists of a ball query into edges i < j with their distances
+
+    :param coords: point coordinates with shape (n, 2)
+    :param neighbours: all neighbour indices concatenated
+    :param offsets: neighbours of point i are neighbours[offsets[i]:offsets[i + 1]]
+    :return: city_1, city_2 and distance arrays
+    """
+    city_1 = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+    keep = city_1 < neighbours
+    city_1 = city_1[keep]
+    city_2 = neighbours[keep]
+    distance = np.sqrt(((coords[city_1] - coords[city_2]) ** 2).sum(axis=1))
+    return city_1, city_2, distance
+
+
+def _reconstruct_path_numpy(predecessors, start_node, end_node):
+    """ Walks the predecessor array from end_node back to start_node
+
+    :param predecessors: predecessor array from scipy's shortest_path
+    :param start_node: The city the path starts from
+    :param end_node: The city the path ends in
+    :return: array with the cities from start_node to end_node, empty if end_node is unreachable
+    """
+    predecessors = predecessors.tolist()
+    sequence = [end_node]
+    x = end_node
+    while x != start_node:
+        x = predecessors[x]
+        if x < 0:
+            return np.empty(0, dtype=np.int64)
+        sequence.append(x)
+    return np.array(sequence[::-1], dtype=np.int64)
+
+
+if HAVE_NUMBA:
+    @njit(cache=True)
+    def _pair_connections_numba(coords, radius):
+        n = coords.shape[0]
+        count = 0
+        capacity = max(n, 16)
+        city_1 = np.empty(capacity, dtype=np.int64)
+        city_2 = np.empty(capacity, dtype=np.int64)
+        distance = np.empty(capacity)
+        radius_sq = radius * radius
+        for i in range(n):
+            for j in range(i + 1, n):
+                dx = coords[i, 0] - coords[j, 0]
+                dy = coords[i, 1] - coords[j, 1]
+                dist_sq = dx * dx + dy * dy
+                if dist_sq <= radius_sq:
+                    if count == capacity:
+                        capacity *= 2
+                        city_1 = np.concatenate((city_1, np.empty(capacity - count, dtype=np.int64)))
+                        city_2 = np.concatenate((city_2, np.empty(capacity - count, dtype=np.int64)))
+                        distance = np.concatenate((distance, np.empty(capacity - count)))
+                    city_1[count] = i
+                    city_2[count] = j
+                    distance[count] = np.sqrt(dist_sq)
+                    count += 1
+        return city_1[:count], city_2[:count], distance[:count]
+
+    @njit(cache=True)
+    def _assemble_edges_numba(coords, neighbours, offsets):
+        n = offsets.shape[0] - 1
+        city_1 = np.empty(neighbours.shape[0], dtype=np.int64)
+        city_2 = np.empty(neighbours.shape[0], dtype=np.int64)
+        distance = np.empty(neighbours.shape[0])
+        count = 0
+        for i in range(n):
+            for k in range(offsets[i], offsets[i + 1]):
+                j = neighbours[k]
+                if i < j:
+                    dx = coords[i, 0] - coords[j, 0]
+                    dy = coords[i, 1] - coords[j, 1]
+                    city_1[count] = i
+                    city_2[count] = j
+                    distance[count] = np.sqrt(dx * dx + dy * dy)
+                    count += 1
+        return city_1[:count], city_2[:count], distance[:count]
+
+    @njit(cache=True)
+    def _reconstruct_path_numba(predecessors, start_node, end_node):
+        length = 1
+        x = end_node
+        while x != start_node:
+            x = predecessors[x]
+            if x < 0:
+                return np.empty(0, dtype=np.int64)
+            length += 1
+        sequence = np.empty(length, dtype=np.int64)
+        x = end_node
+        for k in range(length - 1, -1, -1):
+            sequence[k] = x
+            x = predecessors[x]
+        return sequence
+
+    def pair_connections(coords, radius):
+        return _pair_connections_numba(np.ascontiguousarray(coords, dtype=np.float64), float(radius))
+
+    def assemble_edges(coords, neighbours, offsets):
+        return _assemble_edges_numba(np.ascontiguousarray(coords, dtype=np.float64),
+                                     np.asarray(neighbours, dtype=np.int64), np.asarray(offsets, dtype=np.int64))
+
+    def reconstruct_path(predecessors, start_node, end_node):
+        return _reconstruct_path_numba(predecessors, int(start_node), int(end_node))
+else:
+    def pair_connections(coords, radius):
+        return _pair_connections_numpy(np.asarray(coords, dtype=np.float64), radius)
+
+    def assemble_edges(coords, neighbours, offsets):
+        return _assemble_edges_numpy(np.asarray(coords, dtype=np.float64),
+                                     np.asarray(neighbours, dtype=np.int64), np.asarray(offsets, dtype=np.int64))
+
+    def reconstruct_path(predecessors, start_node, end_node):
+        return _reconstruct_path_numpy(predecessors, int(start_node), int(end_node))
+
+pair_connections.__doc__ = _pair_connections_numpy.__doc__
+assemble_edges.__doc__ = _assemble_edges_numpy.__doc__
+reconstruct_path.__doc__ = _reconstruct_path_numpy.__doc__
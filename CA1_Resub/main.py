@@ -1,14 +1,30 @@
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.collections import LineCollection
-import math
+import itertools
 from scipy.sparse import csr_matrix
 from scipy.sparse.csgraph import shortest_path
 from scipy.spatial import KDTree
 import time
+from kernels import pair_connections, assemble_edges, reconstruct_path
 
 
 
+def mercator_projection(latitude, longitude):
+    """ Converts latitude and longitude in degrees to mercator coordinates. Works on single values as well as arrays.
+
+    :param latitude: latitude(s) in degrees
+    :param longitude: longitude(s) in degrees
+    :return: 2D numpy-array with x coordinates in the first row and y coordinates in the second
+    """
+    R = 1
+    latitude = np.asarray(latitude, dtype=float)
+    longitude = np.asarray(longitude, dtype=float)
+    x_coords = R * ((np.pi * longitude) / 180)
+    y_coords = R * (np.log(np.tan((np.pi / 4) + ((np.pi * latitude) / 360))))
+    return np.array([x_coords, y_coords])
+
+
 def read_coordinate_file(input_file):
     """ Opens and reads data from textfile as well as split and strip this data to make it useful.
         The data is also converted with mercator projection and stored in a Numpy-array.
@@ -16,16 +32,15 @@ def read_coordinate_file(input_file):
     :param input_file: file to extract data from
     type input_file: str
     """
-    R = 1
-    x_coords = []
-    y_coords = []
+    latitudes = []
+    longitudes = []
     with open(input_file) as txt_file:
         for line in txt_file:
             co_ord = line.strip('{}\n')
             co_ord = co_ord.split(',')
-            x_coords.append(R * ((np.pi * float(co_ord[1])) / 180))
-            y_coords.append(R * (np.log(np.tan((np.pi / 4) + ((np.pi * float(co_ord[0])) / 360)))))
-    xy_coords= np.array([x_coords, y_coords])
+            latitudes.append(float(co_ord[0]))
+            longitudes.append(float(co_ord[1]))
+    xy_coords = mercator_projection(latitudes, longitudes)
     return xy_coords
 
 def plot_points(coord_list, indices, path):
@@ -72,21 +87,8 @@ def construct_graph_connections(coord_list, radius):
     :type radius: float
     """
 
-    city_1 = []
-    city_2 = []
-    distance = []
-    coord_list_transposed = coord_list.T
-
-    for i, (point_x, point_y) in enumerate(coord_list_transposed):
-        for j, (x_ref, y_ref) in enumerate(coord_list_transposed):
-            if i < j:
-                dist = math.dist([point_x, point_y], [x_ref, y_ref])
-                if dist <= radius:
-                    city_1.append(i)
-                    city_2.append(j)
-                    distance.append(dist)
+    city_1, city_2, distance_array = pair_connections(coord_list.T, radius)
     indices = np.array([city_1, city_2])
-    distance_array = np.array(distance)
     return indices, distance_array
 
 
@@ -99,23 +101,15 @@ def construct_fast_graph_connections(coord_list, radius):
     :type radius: float
     """
 
-    city1 = []
-    city2 = []
-    distance = []
-
     tree = KDTree(coord_list.T)
+    neighbours = tree.query_ball_point(coord_list.T, radius, workers=-1)
 
-    for i, point in enumerate(coord_list.T):
-        indx = tree.query_ball_point(coord_list[:, i], radius, workers=-1)
+    offsets = np.zeros(len(neighbours) + 1, dtype=np.int64)
+    np.cumsum([len(indx) for indx in neighbours], out=offsets[1:])
+    flat_neighbours = np.fromiter(itertools.chain.from_iterable(neighbours), dtype=np.int64, count=offsets[-1])
 
-        for j in indx:
-            if i < j:
-                ref = coord_list[:, j]
-                city1.append(i)
-                city2.append(j)
-                distance.append(math.dist(point, ref))
+    city1, city2, distance_array = assemble_edges(coord_list.T, flat_neighbours, offsets)
     indices = np.array([city1, city2])
-    distance_array = np.array(distance)
     return indices, distance_array
 
 
@@ -145,13 +139,9 @@ def find_shortest_path(graph, start_node, end_node):
 
     dist_matrix, predecessors = shortest_path(graph, indices=start_node, directed=False, return_predecessors=True)
     dist_min = dist_matrix[end_node]
-    sequence = [end_node]
-    x = end_node
-    while x != start_node:
-        sequence.append(predecessors[x])
-        x = predecessors[x]
+    sequence = reconstruct_path(predecessors, start_node, end_node).tolist()
 
-    return dist_min, sequence[::-1]
+    return dist_min, sequence
 
 
 if __name__ == '__main__':
@@ -163,6 +153,8 @@ if __name__ == '__main__':
     start_node = 31
     end_node = 2
     radius = 0.0025
+    epsilon = None  # Set to e.g. 0.1 to remove connections that can be replaced by a path at most 10% longer
+    cones = None  # Set to e.g. 12 to keep only the shortest connection in each of 12 directions around every city
 
     # city = "SampleCoordinates.txt"
     # start_node = 0
@@ -189,6 +181,27 @@ if __name__ == '__main__':
     end_time = time.time()
     print("The function \"construct_fast_graph_connections\" takes: ", end_time - start_time, "seconds to execute")
 
+    if epsilon is not None:
+        from spanner import greedy_spanner, max_stretch
+        start_time = time.time()
+        sparse_indices, sparse_distance = greedy_spanner(indices, distance_array, len(coord_list[0]), epsilon)
+        end_time = time.time()
+        print("The function \"greedy_spanner\" takes: ", end_time - start_time, "seconds to execute")
+        print("Kept", len(sparse_distance), "of", len(distance_array), "connections, worst-case path-length error:",
+              max_stretch(indices, distance_array, sparse_indices, sparse_distance, len(coord_list[0])) - 1)
+        indices, distance_array = sparse_indices, sparse_distance
+
+    if cones is not None:
+        from spanner import yao_spanner, yao_stretch_bound, max_stretch
+        start_time = time.time()
+        sparse_indices, sparse_distance = yao_spanner(coord_list, indices, distance_array, cones)
+        end_time = time.time()
+        print("The function \"yao_spanner\" takes: ", end_time - start_time, "seconds to execute")
+        print("Kept", len(sparse_distance), "of", len(distance_array), "connections, worst-case path-length error:",
+              max_stretch(indices, distance_array, sparse_indices, sparse_distance, len(coord_list[0])) - 1,
+              "bound:", yao_stretch_bound(cones) - 1)
+        indices, distance_array = sparse_indices, sparse_distance
+
     start_time = time.time()
     graph = construct_graph(indices, distance_array, len(coord_list[0]))
     end_time = time.time()
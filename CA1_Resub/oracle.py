@@ -0,0 +1,80 @@
+import numpy as np
+from scipy.sparse.csgraph import dijkstra, connected_components
+
+
+class DistanceOracle(object):
+    """ Approximate distance oracle of Thorup and Zwick with k = 2, giving estimates with stretch at most 3.
+        About sqrt(n) pivot cities are sampled (at least one in every connected part of the graph) and the distance
+        from every pivot to every city is stored. For every city u the exact distances to the cities closer to u
+        than its nearest pivot p(u) are stored as well. If v is not that close to u, then d(u, p(u)) <= d(u, v)
+        and d(u, p(u)) + d(p(u), v) <= 3 d(u, v). Exact distances are still given by find_shortest_path in main.py.
+
+    :param graph: Matrix with all indices and distances
+    :param pivots: number of sampled pivot cities, defaults to sqrt(n)
+    :param seed: seed used when sampling the pivots
+    :param chunk_size: number of cities searched at once while building, limits the memory to chunk_size * n values
+    """
+
+    def __init__(self, graph, pivots=None, seed=0, chunk_size=256):
+        n = graph.shape[0]
+        self.n = n
+        rng = np.random.default_rng(seed)
+        if pivots is None:
+            pivots = int(np.ceil(np.sqrt(n)))
+
+        _, component = connected_components(graph, directed=False)
+        first_in_component = np.unique(component, return_index=True)[1]
+        sampled = rng.choice(n, size=min(pivots, n), replace=False)
+        self.pivots = np.union1d(first_in_component, sampled)
+
+        # Distances are kept in float64, rounding them to float32 gives estimates below the true distance. Sums of the
+        # same path in another order still differ by up to n rounding errors, so estimates are rounded up by that much
+        self.round_up = 1 + 2 * n * np.finfo(np.float64).eps
+        self.pivot_dist = dijkstra(graph, directed=False, indices=self.pivots)
+        self.nearest_pivot = np.argmin(self.pivot_dist, axis=0)
+        self.dist_to_pivot = self.pivot_dist[self.nearest_pivot, np.arange(n)]
+
+        # Cities are searched in order of their pivot distance, so each chunk can use one small search limit
+        keys = []
+        values = []
+        order = np.argsort(self.dist_to_pivot)
+        for start in range(0, n, chunk_size):
+            sources = order[start:start + chunk_size]
+            dist = dijkstra(graph, directed=False, indices=sources, limit=float(self.dist_to_pivot[sources].max()))
+            row, col = np.nonzero(dist < self.dist_to_pivot[sources][:, None])
+            keys.append(sources[row].astype(np.int64) * n + col)
+            values.append(dist[row, col])
+        keys = np.concatenate(keys)
+        key_order = np.argsort(keys)
+        self.ball_keys = keys[key_order]
+        self.ball_dist = np.concatenate(values)[key_order]
+
+    def _ball_distance(self, u, v):
+        """ Returns d(u, v) where v is closer to u than p(u), otherwise inf """
+        keys = u.astype(np.int64) * self.n + v
+        if not len(self.ball_keys):
+            # No city is closer to any other city than its nearest pivot, e.g. when every city is a pivot
+            return np.full(keys.shape, np.inf)
+        position = np.minimum(np.searchsorted(self.ball_keys, keys), len(self.ball_keys) - 1)
+        found = self.ball_keys[position] == keys
+        return np.where(found, self.ball_dist[position], np.inf)
+
+    def approx_distance(self, u, v):
+        """ Returns an estimate of the distance between u and v that is at least the true distance and at most
+            three times it, vectorized over arrays of pairs. Each query costs a few table lookups.
+
+        :param u: city or array of cities
+        :param v: city or array of cities
+        :return: estimated distance(s), inf if the cities are not connected
+        """
+        u, v = np.broadcast_arrays(np.asarray(u), np.asarray(v))
+        estimate = np.minimum.reduce([
+            self._ball_distance(u, v),
+            self._ball_distance(v, u),
+            self.dist_to_pivot[u] + self.pivot_dist[self.nearest_pivot[u], v],
+            self.dist_to_pivot[v] + self.pivot_dist[self.nearest_pivot[v], u],
+        ]) * self.round_up
+        estimate = np.where(u == v, 0.0, estimate)
+        if estimate.ndim == 0:
+            return float(estimate)
+        return estimate
@@ -0,0 +1,117 @@
+import os
+import threading
+from collections import OrderedDict, namedtuple
+from concurrent.futures import Future
+from main import read_coordinate_file, construct_fast_graph_connections, construct_graph, find_shortest_path
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_DATASETS = {
+    'sample': os.path.join(DATA_DIR, 'SampleCoordinates.txt'),
+    'germany': os.path.join(DATA_DIR, 'GermanyCities.txt'),
+    'hungary': os.path.join(DATA_DIR, 'HungaryCities.txt'),
+}
+
+LoadedGraph = namedtuple('LoadedGraph', ['coord_list', 'graph', 'nbytes'])
+
+
+def graph_nbytes(coord_list, graph):
+    """ Returns the memory used by the coordinates and the sparse matrix of a loaded graph """
+    return coord_list.nbytes + graph.data.nbytes + graph.indices.nbytes + graph.indptr.nbytes
+
+
+class GraphRegistry(object):
+    """ Serves graphs for several datasets and radii from one process.
+        A graph is loaded the first time it is asked for and kept until the total memory of all loaded graphs
+        exceeds the budget, then the least recently used graphs are evicted. Threads asking for a graph that is
+        being loaded wait for that load instead of starting their own.
+
+    :param datasets: maps dataset names to coordinate files
+    :type datasets: dict
+    :param memory_budget: maximum number of bytes used by loaded graphs, None for no limit
+    :type memory_budget: int
+    """
+
+    def __init__(self, datasets=None, memory_budget=None):
+        self.datasets = dict(DEFAULT_DATASETS if datasets is None else datasets)
+        self.memory_budget = memory_budget
+        self.loaded = OrderedDict()
+        self.loading = {}
+        self.nbytes = 0
+        self.lock = threading.Lock()
+
+    def register(self, name, input_file):
+        self.datasets[name] = input_file
+
+    def get(self, name, radius):
+        """ Returns the loaded graph for a dataset and radius, loading it if needed
+
+        :param name: name of the dataset
+        :param radius: allowed distance between cities to make a connection
+        :return: LoadedGraph with coord_list, graph and nbytes
+        """
+        key = (name, radius)
+        with self.lock:
+            if key in self.loaded:
+                self.loaded.move_to_end(key)
+                return self.loaded[key]
+            future = self.loading.get(key)
+            owner = future is None
+            if owner:
+                if name not in self.datasets:
+                    raise KeyError(f"Unknown dataset {name!r}")
+                future = Future()
+                self.loading[key] = future
+
+        if not owner:
+            return future.result()
+
+        try:
+            loaded = self._load(self.datasets[name], radius)
+        except BaseException as error:
+            with self.lock:
+                del self.loading[key]
+            future.set_exception(error)
+            raise
+
+        with self.lock:
+            del self.loading[key]
+            self.loaded[key] = loaded
+            self.nbytes += loaded.nbytes
+            self._evict(keep=key)
+        future.set_result(loaded)
+        return loaded
+
+    @staticmethod
+    def _load(input_file, radius):
+        coord_list = read_coordinate_file(input_file)
+        indices, distance_array = construct_fast_graph_connections(coord_list, radius)
+        graph = construct_graph(indices, distance_array, len(coord_list[0]))
+        return LoadedGraph(coord_list, graph, graph_nbytes(coord_list, graph))
+
+    def _evict(self, keep):
+        """ Removes least recently used graphs until the budget is met. The graph given by keep is never removed. """
+        if self.memory_budget is None:
+            return
+        for key in list(self.loaded):
+            if self.nbytes <= self.memory_budget:
+                break
+            if key != keep:
+                self.nbytes -= self.loaded.pop(key).nbytes
+
+    def evict(self, name, radius):
+        with self.lock:
+            loaded = self.loaded.pop((name, radius), None)
+            if loaded is not None:
+                self.nbytes -= loaded.nbytes
+
+    def find_shortest_path(self, name, radius, start_node, end_node):
+        """ Finds the shortest path between two cities in a dataset
+
+        :param name: name of the dataset
+        :param radius: allowed distance between cities to make a connection
+        :param start_node: The city the path should start from
+        :param end_node: The city the path should end in
+        :return: dist_min, sequence
+        """
+        return find_shortest_path(self.get(name, radius).graph, start_node, end_node)
@@ -0,0 +1,87 @@
+import pickle
+import numpy as np
+from scipy.spatial import KDTree
+from scipy.sparse.csgraph import shortest_path
+from main import mercator_projection, read_coordinate_file
+from kernels import reconstruct_path
+
+
+class CitySnapper(object):
+    """ Maps raw latitude/longitude positions to the nearest city in a coordinate list.
+        The KDTree is built once over the mercator coordinates and can be saved to and loaded from disk.
+
+    :param coord_list: contains coordinates of all cities, as returned by read_coordinate_file
+    :type coord_list: 2D numpy-array
+    """
+
+    def __init__(self, coord_list):
+        self.coord_list = coord_list
+        self.tree = KDTree(coord_list.T)
+
+    @classmethod
+    def from_file(cls, input_file):
+        """ Creates a snapper directly from a coordinate file
+
+        :param input_file: file to extract data from
+        :type input_file: str
+        """
+        return cls(read_coordinate_file(input_file))
+
+    def save(self, filename):
+        """ Stores the coordinates and the built KDTree so it does not have to be rebuilt
+
+        :param filename: file to write to
+        """
+        with open(filename, 'wb') as f:
+            pickle.dump((self.coord_list, self.tree), f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, filename):
+        """ Loads a snapper that has previously been stored with save
+
+        :param filename: file to read from
+        """
+        snapper = cls.__new__(cls)
+        with open(filename, 'rb') as f:
+            snapper.coord_list, snapper.tree = pickle.load(f)
+        return snapper
+
+    def snap(self, latitude, longitude):
+        """ Finds the nearest city for every given position in one vectorized query
+
+        :param latitude: latitude(s) in degrees
+        :param longitude: longitude(s) in degrees
+        :return: node ids of the nearest cities and the distances to them (in mercator units)
+        """
+        points = mercator_projection(latitude, longitude)
+        distance, nodes = self.tree.query(points.T, workers=-1)
+        return nodes, distance
+
+
+def find_shortest_paths_by_coordinates(graph, snapper, start_points, end_points):
+    """ Finds the shortest path between each pair of start and end positions given as latitude/longitude.
+        Positions are snapped to their nearest city and one shortest_path call is made for all unique start cities.
+
+    :param graph: Matrix with all indices and distances
+    :param snapper: CitySnapper built over the same coordinates as the graph
+    :param start_points: array of shape (N, 2) with latitude and longitude of the start positions
+    :param end_points: array of shape (N, 2) with latitude and longitude of the end positions
+    :return: list with (dist_min, sequence) for every pair, dist_min is inf and sequence empty if unreachable
+    """
+    start_points = np.atleast_2d(np.asarray(start_points, dtype=float))
+    end_points = np.atleast_2d(np.asarray(end_points, dtype=float))
+    start_nodes, _ = snapper.snap(start_points[:, 0], start_points[:, 1])
+    end_nodes, _ = snapper.snap(end_points[:, 0], end_points[:, 1])
+
+    unique_starts, row = np.unique(start_nodes, return_inverse=True)
+    dist_matrix, predecessors = shortest_path(graph, indices=unique_starts, directed=False,
+                                              return_predecessors=True)
+
+    paths = []
+    for r, start_node, end_node in zip(row, start_nodes, end_nodes):
+        dist_min = dist_matrix[r, end_node]
+        if np.isinf(dist_min):
+            paths.append((dist_min, []))
+            continue
+        paths.append((dist_min, reconstruct_path(predecessors[r], start_node, end_node).tolist()))
+    return paths
@@ -0,0 +1,105 @@
+import numpy as np
+from scipy.sparse.csgraph import dijkstra
+from main import construct_graph
+
+
+def _spanner_distances(indices, distance, n, sources, targets, limit, chunk_size=256):
+    """ Computes the distance in the graph given by indices and distance between each source and target pair.
+        The searches are bounded by limit and made for chunk_size unique sources at a time to bound the memory.
+
+    :return: array with the distances, inf where the distance is larger than limit
+    """
+    graph = construct_graph(indices, distance, n)
+    unique_sources, row = np.unique(sources, return_inverse=True)
+    result = np.empty(len(sources))
+    for start in range(0, len(unique_sources), chunk_size):
+        dist = dijkstra(graph, directed=False, indices=unique_sources[start:start + chunk_size], limit=limit)
+        in_chunk = (row >= start) & (row < start + chunk_size)
+        result[in_chunk] = dist[row[in_chunk] - start, targets[in_chunk]]
+    return result
+
+
+def greedy_spanner(indices, distance, n, epsilon, batches=16):
+    """ Removes every connection that can be replaced by a path at most (1 + epsilon) times as long.
+        Connections are handled from shortest to longest as in the greedy spanner, but in batches of similar length
+        so that each batch needs only one bounded search per city. Connections in the same batch can't replace
+        each other, which keeps a few more connections than the exact greedy spanner but never breaks the bound.
+
+    :param indices: contains the connections
+    :param distance: contains the distance between indices
+    :param n: length of coordlist
+    :param epsilon: allowed relative increase of any shortest path
+    :param batches: number of length batches
+    :return: indices and distance of the kept connections
+    """
+    order = np.argsort(distance, kind='stable')
+    indices = indices[:, order]
+    distance = distance[order]
+    keep = np.zeros(len(distance), dtype=bool)
+
+    for batch in np.array_split(np.arange(len(distance)), batches):
+        if len(batch) == 0:
+            continue
+        if not keep.any():
+            keep[batch] = True
+            continue
+        limit = (1 + epsilon) * distance[batch[-1]]
+        detour = _spanner_distances(indices[:, keep], distance[keep], n, indices[0, batch], indices[1, batch], limit)
+        keep[batch] = detour > (1 + epsilon) * distance[batch]
+
+    return indices[:, keep], distance[keep]
+
+
+def yao_spanner(coord_list, indices, distance, cones):
+    """ Keeps, for every city, only the shortest connection inside each of a number of equally sized cones
+        around it. This is fully vectorized but the stretch bound 1 / (1 - 2 sin(pi / cones)) requires cones > 6.
+
+    :param coord_list: contains coordinates of all cities
+    :param indices: contains the connections
+    :param distance: contains the distance between indices
+    :param cones: number of cones around each city
+    :return: indices and distance of the kept connections
+    """
+    source = np.concatenate((indices[0], indices[1]))
+    target = np.concatenate((indices[1], indices[0]))
+    edge = np.concatenate((np.arange(len(distance)), np.arange(len(distance))))
+    angle = np.arctan2(coord_list[1][target] - coord_list[1][source], coord_list[0][target] - coord_list[0][source])
+    cone = np.minimum((angle + np.pi) / (2 * np.pi) * cones, cones - 1).astype(np.int64)
+
+    order = np.lexsort((distance[edge], source * cones + cone))
+    key = (source * cones + cone)[order]
+    first = np.ones(len(key), dtype=bool)
+    first[1:] = key[1:] != key[:-1]
+
+    keep = np.zeros(len(distance), dtype=bool)
+    keep[edge[order][first]] = True
+    return indices[:, keep], distance[keep]
+
+
+def yao_stretch_bound(cones):
+    """ Returns the theoretical stretch factor of a Yao graph with the given number of cones """
+    if cones <= 6:
+        return np.inf
+    return 1 / (1 - 2 * np.sin(np.pi / cones))
+
+
+def max_stretch(indices, distance, sparse_indices, sparse_distance, n, limit_factor=4):
+    """ Measures the worst-case path-length error of a sparsified graph. Since every shortest path consists of
+        connections, the largest stretch over all removed connections is the largest stretch over all city pairs.
+
+    :param indices: connections of the full graph
+    :param distance: distances of the full graph
+    :param sparse_indices: connections of the sparsified graph
+    :param sparse_distance: distances of the sparsified graph
+    :param n: length of coordlist
+    :param limit_factor: replacement paths longer than limit_factor times the connection count as inf
+    :return: largest ratio between the sparsified and the original path length
+    """
+    n_kept = len(sparse_distance)
+    if n_kept == len(distance):
+        return 1.0
+    kept = set(zip(sparse_indices[0].tolist(), sparse_indices[1].tolist()))
+    removed = np.array([(i, j) not in kept for i, j in zip(indices[0].tolist(), indices[1].tolist())])
+    detour = _spanner_distances(sparse_indices, sparse_distance, n, indices[0, removed], indices[1, removed],
+                                limit_factor * distance[removed].max())
+    return float(np.max(detour / distance[removed]))
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+from main import read_coordinate_file, construct_fast_graph_connections, construct_graph, find_shortest_path
+from alternatives import find_alternative_paths, _SearchState
+
+
+@pytest.fixture
+def graph():
+    coord_list = read_coordinate_file('SampleCoordinates.txt')
+    indices, distance_array = construct_fast_graph_connections(coord_list, 0.08)
+    return construct_graph(indices, distance_array, len(coord_list[0]))
+
+
+def edge_length(graph, u, v):
+    # The graph only holds each connection in one direction
+    return max(graph[u, v], graph[v, u])
+
+
+def test_find_alternative_paths(graph):
+    data = graph.data.copy()
+    dist_min, sequence = find_shortest_path(graph, 0, 5)
+
+    paths = find_alternative_paths(graph, 0, 5, k=5, max_overlap=1.0, max_stretch=1.5)
+    assert len(paths) == 5
+    assert paths[0][0] == pytest.approx(dist_min)
+    assert paths[0][1] == sequence
+    assert [dist for dist, _ in paths] == sorted(dist for dist, _ in paths)
+    assert len({tuple(path) for _, path in paths}) == len(paths)
+    for dist, path in paths:
+        assert path[0] == 0 and path[-1] == 5
+        assert len(set(path)) == len(path)
+        lengths = [edge_length(graph, u, v) for u, v in zip(path[:-1], path[1:])]
+        assert all(length > 0 for length in lengths)
+        assert dist == pytest.approx(sum(lengths))
+        assert dist <= 1.5 * dist_min
+
+    # Paths longer than max_stretch times the shortest one are left out
+    assert len(find_alternative_paths(graph, 0, 5, k=5, max_overlap=1.0, max_stretch=1.17)) == 2
+    # Alternatives may only share max_overlap of their length with a path that was chosen before them
+    distinct = find_alternative_paths(graph, 0, 5, k=5, max_overlap=0.3)
+    assert 1 < len(distinct) < 5
+    for i, (dist, path) in enumerate(distinct):
+        for _, other in distinct[:i]:
+            other_edges = set(zip(other[:-1], other[1:])) | set(zip(other[1:], other[:-1]))
+            shared = sum(edge_length(graph, u, v) for u, v in zip(path[:-1], path[1:]) if (u, v) in other_edges)
+            assert shared <= 0.3 * dist
+    np.testing.assert_array_equal(graph.data, data)
+
+
+def test_search_state_restore(graph):
+    state = _SearchState(graph, 5)
+    data = state.graph.data.copy()
+    dist, path = state.spur_path(0, {3}, {(0, 4), (4, 0)})
+    assert path[0] == 0 and path[-1] == 5
+    assert 3 not in path and path[1] != 4
+    assert dist == pytest.approx(sum(edge_length(graph, u, v) for u, v in zip(path[:-1], path[1:])))
+    np.testing.assert_array_equal(state.graph.data, data)
+    assert state.masked == []
@@ -0,0 +1,99 @@
+import math
+import numpy as np
+import pytest
+from scipy.spatial import KDTree
+from scipy.sparse.csgraph import shortest_path
+import kernels
+from main import read_coordinate_file, construct_graph
+
+IMPLEMENTATIONS = ['numpy'] + (['numba'] if kernels.HAVE_NUMBA else [])
+
+
+def implementation(name):
+    """ Returns the pair_connections, assemble_edges and reconstruct_path of one implementation """
+    if name == 'numpy':
+        return (lambda coords, radius: kernels._pair_connections_numpy(coords, radius, block_size=100),
+                kernels._assemble_edges_numpy, kernels._reconstruct_path_numpy)
+    return (kernels._pair_connections_numba, kernels._assemble_edges_numba, kernels._reconstruct_path_numba)
+
+
+@pytest.fixture(scope='module')
+def hungary():
+    return np.ascontiguousarray(read_coordinate_file('HungaryCities.txt').T)
+
+
+def baseline_pair_connections(coords, radius):
+    # The loop construct_graph_connections had before the kernels
+    city_1, city_2, distance = [], [], []
+    for i, (point_x, point_y) in enumerate(coords):
+        for j, (x_ref, y_ref) in enumerate(coords):
+            if i < j:
+                dist = math.dist([point_x, point_y], [x_ref, y_ref])
+                if dist <= radius:
+                    city_1.append(i)
+                    city_2.append(j)
+                    distance.append(dist)
+    return np.array(city_1), np.array(city_2), np.array(distance)
+
+
+def baseline_path(predecessors, start_node, end_node):
+    # The loop find_shortest_path had before the kernels
+    sequence = [end_node]
+    x = end_node
+    while x != start_node:
+        x = predecessors[x]
+        sequence.append(x)
+    return sequence[::-1]
+
+
+@pytest.mark.parametrize('name', IMPLEMENTATIONS)
+def test_pair_connections(hungary, name):
+    pair_connections, _, _ = implementation(name)
+    expected = baseline_pair_connections(hungary, 0.005)
+    city_1, city_2, distance = pair_connections(hungary, 0.005)
+    assert len(city_1) == len(expected[0]) > 0
+    np.testing.assert_array_equal(city_1, expected[0])
+    np.testing.assert_array_equal(city_2, expected[1])
+    np.testing.assert_allclose(distance, expected[2], rtol=1e-12)
+
+    empty = pair_connections(np.zeros((0, 2)), 0.005)
+    assert all(len(array) == 0 for array in empty)
+
+
+@pytest.mark.parametrize('name', IMPLEMENTATIONS)
+def test_assemble_edges(hungary, name):
+    _, assemble_edges, _ = implementation(name)
+    neighbours = KDTree(hungary).query_ball_point(hungary, 0.005)
+    offsets = np.zeros(len(neighbours) + 1, dtype=np.int64)
+    np.cumsum([len(indx) for indx in neighbours], out=offsets[1:])
+    flat = np.concatenate([np.array(indx, dtype=np.int64) for indx in neighbours])
+    city_1, city_2, distance = assemble_edges(hungary, flat, offsets)
+
+    # The loop construct_fast_graph_connections had before the kernels
+    expected = [(i, j, math.dist(hungary[i], hungary[j])) for i, indx in enumerate(neighbours) for j in indx if i < j]
+    assert [(i, j) for i, j, _ in expected] == list(zip(city_1.tolist(), city_2.tolist()))
+    np.testing.assert_allclose(distance, [dist for _, _, dist in expected], rtol=1e-12)
+
+
+@pytest.mark.parametrize('name', IMPLEMENTATIONS)
+def test_reconstruct_path(hungary, name):
+    pair_connections, _, reconstruct_path = implementation(name)
+    city_1, city_2, distance = pair_connections(hungary, 0.005)
+    graph = construct_graph(np.array([city_1, city_2]), distance, len(hungary))
+    dist, predecessors = shortest_path(graph, indices=311, directed=False, return_predecessors=True)
+    for end_node in (702, 311, 0, 849):
+        if np.isfinite(dist[end_node]):
+            assert reconstruct_path(predecessors, 311, end_node).tolist() == baseline_path(predecessors, 311, end_node)
+        else:
+            assert len(reconstruct_path(predecessors, 311, end_node)) == 0
+    unreachable = np.flatnonzero(np.isinf(dist))
+    assert len(unreachable) > 0
+    assert len(reconstruct_path(predecessors, 311, unreachable[0])) == 0
+
+
+def test_implementations_agree(hungary):
+    # Both implementations give exactly the same connections and distances
+    results = [implementation(name)[0](hungary, 0.01) for name in IMPLEMENTATIONS]
+    for result in results[1:]:
+        for array, other in zip(results[0], result):
+            np.testing.assert_array_equal(array, other)
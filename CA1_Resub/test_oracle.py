@@ -0,0 +1,38 @@
+import pytest
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+from main import read_coordinate_file, construct_fast_graph_connections, construct_graph
+from oracle import DistanceOracle
+
+
+def test_approx_distance_bounds():
+    coord_list = read_coordinate_file('HungaryCities.txt')
+    indices, distance_array = construct_fast_graph_connections(coord_list, 0.005)
+    graph = construct_graph(indices, distance_array, len(coord_list[0]))
+    oracle = DistanceOracle(graph)
+
+    exact = dijkstra(graph, directed=False)
+    cities = np.arange(graph.shape[0])
+    estimate = oracle.approx_distance(cities[:, None], cities[None, :])
+    connected = np.isfinite(exact)
+    # Never below the true distance, not even by a rounding error, and at most three times it
+    assert np.all(estimate[connected] >= exact[connected])
+    assert np.all(estimate[connected] <= 3 * exact[connected])
+    assert np.all(np.isinf(estimate[~connected]))
+    assert oracle.approx_distance(311, 702) >= exact[311, 702]
+
+
+def test_no_balls():
+    # Without connections every city is its own pivot, so no city has any other city in its ball
+    oracle = DistanceOracle(csr_matrix((4, 4)))
+    assert len(oracle.ball_keys) == 0
+    assert oracle.approx_distance(0, 0) == 0
+    assert np.isinf(oracle.approx_distance(0, 3))
+    assert np.all(np.isinf(oracle.approx_distance([0, 1], [2, 3])))
+
+    # Same when every city of a connected graph is chosen as a pivot
+    graph = csr_matrix(([1.0, 2.0], ([0, 1], [1, 2])), shape=(3, 3))
+    oracle = DistanceOracle(graph, pivots=3)
+    assert len(oracle.ball_keys) == 0
+    assert oracle.approx_distance(0, 2) == pytest.approx(3.0)
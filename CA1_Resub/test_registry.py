@@ -0,0 +1,112 @@
+import threading
+import time
+import pytest
+from main import find_shortest_path
+from registry import GraphRegistry, DEFAULT_DATASETS
+
+
+class CountingRegistry(GraphRegistry):
+    """ GraphRegistry that counts its loads and can hold them until release is set """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.loads = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+    def _load(self, input_file, radius):
+        self.loads += 1
+        self.started.set()
+        self.release.wait()
+        return GraphRegistry._load(input_file, radius)
+
+
+def run_held(registry, target, count):
+    """ Runs target in count threads while the registry holds its first load, so all of them ask before it ends """
+    registry.release.clear()
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    assert registry.started.wait(10)
+    time.sleep(0.2)
+    registry.release.set()
+    for thread in threads:
+        thread.join(10)
+
+
+def sample_registry(memory_budget=None, names=('sample',)):
+    return CountingRegistry({name: DEFAULT_DATASETS['sample'] for name in names}, memory_budget)
+
+
+def test_lazy_loading():
+    registry = sample_registry()
+    assert registry.loads == 0 and len(registry.loaded) == 0
+
+    loaded = registry.get('sample', 0.08)
+    assert registry.loads == 1 and registry.nbytes == loaded.nbytes > 0
+    assert registry.get('sample', 0.08) is loaded
+    assert registry.loads == 1
+    assert registry.find_shortest_path('sample', 0.08, 0, 5)[1] == find_shortest_path(loaded.graph, 0, 5)[1]
+    assert registry.loads == 1
+
+    registry.get('sample', 0.1)
+    assert registry.loads == 2 and len(registry.loaded) == 2
+
+    registry.evict('sample', 0.08)
+    assert list(registry.loaded) == [('sample', 0.1)]
+    registry.get('sample', 0.08)
+    assert registry.loads == 3
+
+    with pytest.raises(KeyError):
+        registry.get('unknown', 0.08)
+
+
+def test_concurrent_first_requests():
+    registry = sample_registry()
+    results = []
+    run_held(registry, lambda: results.append(registry.get('sample', 0.08)), 8)
+
+    # One thread loaded the graph and all the others waited for it
+    assert registry.loads == 1
+    assert len(results) == 8 and all(result is results[0] for result in results)
+    assert registry.loading == {}
+
+
+def test_memory_budget():
+    names = ('first', 'second', 'third')
+    size = sample_registry(names=names).get('first', 0.08).nbytes
+    registry = sample_registry(memory_budget=2 * size, names=names)
+
+    registry.get('first', 0.08)
+    registry.get('second', 0.08)
+    registry.get('first', 0.08)
+    registry.get('third', 0.08)
+    # second was used least recently
+    assert list(registry.loaded) == [('first', 0.08), ('third', 0.08)]
+    assert registry.nbytes == 2 * size <= registry.memory_budget
+
+    # A graph larger than the whole budget is still served and kept until the next load
+    registry.memory_budget = size // 2
+    loaded = registry.get('second', 0.08)
+    assert list(registry.loaded) == [('second', 0.08)] and registry.nbytes == loaded.nbytes
+
+
+def test_failed_load(tmp_path):
+    registry = CountingRegistry({'missing': str(tmp_path / 'missing.txt')})
+    errors = []
+
+    def get():
+        try:
+            registry.get('missing', 0.08)
+        except FileNotFoundError as error:
+            errors.append(error)
+
+    run_held(registry, get, 4)
+
+    # Every waiting thread gets the error and nothing is left behind, so the next request tries again
+    assert len(errors) == 4 and registry.loads == 1
+    assert registry.loading == {} and len(registry.loaded) == 0 and registry.nbytes == 0
+    with pytest.raises(FileNotFoundError):
+        registry.get('missing', 0.08)
+    assert registry.loads == 2 and registry.loading == {}
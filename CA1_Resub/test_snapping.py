@@ -0,0 +1,46 @@
+import numpy as np
+from scipy.sparse.csgraph import connected_components
+from main import construct_fast_graph_connections, construct_graph, find_shortest_path
+from snapping import CitySnapper, find_shortest_paths_by_coordinates
+
+
+def read_positions(input_file):
+    """ Returns the latitudes and longitudes of a coordinate file in degrees """
+    with open(input_file) as txt_file:
+        return np.array([[float(value) for value in line.strip('{}\n').split(',')] for line in txt_file])
+
+
+def test_snap_and_save(tmp_path):
+    positions = read_positions('HungaryCities.txt')
+    snapper = CitySnapper.from_file('HungaryCities.txt')
+    nodes, distance = snapper.snap(positions[:, 0], positions[:, 1])
+    # Every city snaps to itself, or to an earlier city at the same position
+    assert np.all(distance < 1e-12)
+    np.testing.assert_array_equal(snapper.coord_list[:, nodes], snapper.coord_list)
+    assert np.mean(nodes == np.arange(len(positions))) > 0.99
+
+    node, _ = snapper.snap(positions[311, 0] + 1e-4, positions[311, 1] - 1e-4)
+    assert node == 311
+
+    filename = str(tmp_path / 'hungary.snapper')
+    snapper.save(filename)
+    loaded = CitySnapper.load(filename)
+    np.testing.assert_array_equal(loaded.coord_list, snapper.coord_list)
+    np.testing.assert_array_equal(loaded.snap(positions[:, 0], positions[:, 1])[0], nodes)
+
+
+def test_shortest_paths_by_coordinates():
+    positions = read_positions('HungaryCities.txt')
+    snapper = CitySnapper.from_file('HungaryCities.txt')
+    indices, distance_array = construct_fast_graph_connections(snapper.coord_list, 0.005)
+    graph = construct_graph(indices, distance_array, len(positions))
+    _, component = connected_components(graph, directed=False)
+    unreachable = int(np.flatnonzero(component != component[311])[0])
+
+    paths = find_shortest_paths_by_coordinates(graph, snapper, positions[[311, 311, 0]],
+                                               positions[[702, unreachable, 311]])
+    assert len(paths) == 3
+    for (dist_min, sequence), (start, end) in zip([paths[0], paths[2]], [(311, 702), (0, 311)]):
+        expected = find_shortest_path(graph, start, end)
+        assert dist_min == expected[0] and sequence == expected[1]
+    assert paths[1] == (np.inf, [])
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+from scipy.sparse.csgraph import dijkstra
+from main import read_coordinate_file, construct_fast_graph_connections, construct_graph
+from spanner import greedy_spanner, yao_spanner, yao_stretch_bound, max_stretch
+
+
+@pytest.fixture(scope='module')
+def hungary():
+    coord_list = read_coordinate_file('HungaryCities.txt')
+    indices, distance_array = construct_fast_graph_connections(coord_list, 0.02)
+    return coord_list, indices, distance_array
+
+
+def test_greedy_spanner(hungary):
+    coord_list, indices, distance_array = hungary
+    n = len(coord_list[0])
+    epsilon = 0.1
+    sparse_indices, sparse_distance = greedy_spanner(indices, distance_array, n, epsilon)
+    assert len(sparse_distance) < len(distance_array) / 5
+    stretch = max_stretch(indices, distance_array, sparse_indices, sparse_distance, n)
+    assert 1 < stretch <= 1 + epsilon
+
+    # The bound holds for every pair of cities, not only for the removed connections
+    exact = dijkstra(construct_graph(indices, distance_array, n), directed=False, indices=np.arange(0, n, 50))
+    sparse = dijkstra(construct_graph(sparse_indices, sparse_distance, n), directed=False, indices=np.arange(0, n, 50))
+    connected = np.isfinite(exact) & (exact > 0)
+    assert np.array_equal(np.isfinite(exact), np.isfinite(sparse))
+    assert np.all(sparse[connected] <= (1 + epsilon) * exact[connected] * (1 + 1e-12))
+
+    assert max_stretch(indices, distance_array, indices, distance_array, n) == 1.0
+
+
+@pytest.mark.parametrize('cones', [8, 12])
+def test_yao_spanner(hungary, cones):
+    coord_list, indices, distance_array = hungary
+    n = len(coord_list[0])
+    sparse_indices, sparse_distance = yao_spanner(coord_list, indices, distance_array, cones)
+    assert len(sparse_distance) < len(distance_array) / 5
+    assert max_stretch(indices, distance_array, sparse_indices, sparse_distance, n) <= yao_stretch_bound(cones)
+    assert yao_stretch_bound(6) == np.inf
@@ -0,0 +1,277 @@
+"""Speed benchmarks and differential correctness checks for the hand evaluators in cardlib.
+
+Run ``python benchmark.py`` to measure import times and the hands per second of every evaluator, split by hand
+category and by the number of cards, and to check the evaluators against a simple reference ranking. The results
+are printed as JSON (or written to --output) so runs can be compared to catch regressions. The exit code is 1 if
+any check fails.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from collections import Counter
+import numpy as np
+from cardlib import (CARDS, HandValue, Hand, PokerHand, StandardDeck, evaluate_cards, evaluate_batch,
+                     evaluation_cache, combination_indices)
+
+
+def reference_rank(cards):
+    """ Straightforward reference ranking of exactly five cards as a tuple (hand type, tie-breaking values) """
+    values = sorted((c.get_value() for c in cards), reverse=True)
+    groups = sorted(Counter(values).items(), key=lambda item: (item[1], item[0]), reverse=True)
+    flush = len(set(int(c.get_suit()) for c in cards)) == 1
+    straight = None
+    if len(groups) == 5 and values[0] - values[4] == 4:
+        straight = values[0]
+    elif values == [14, 5, 4, 3, 2]:
+        straight = 5
+    counts = [count for _, count in groups]
+    ranked = [value for value, _ in groups]
+    if straight and flush:
+        return 9, [straight]
+    if counts[0] == 4:
+        return 8, ranked
+    if counts[:2] == [3, 2]:
+        return 7, ranked
+    if flush:
+        return 6, values
+    if straight:
+        return 5, [straight]
+    if counts[0] == 3:
+        return 4, ranked
+    if counts[:2] == [2, 2]:
+        return 3, ranked
+    if counts[0] == 2:
+        return 2, ranked
+    return 1, values
+
+
+def reference_ranks(card_ids):
+    """ Ranks hands of five or more cards with reference_rank, taking the best five cards of each hand.
+
+    :param card_ids: (N, k) array of card ids
+    :return: (N,) array of dense ranks, equal ranks for equally strong hands and higher ranks for better hands
+    """
+    memo = {}
+    keys = []
+    for row in np.asarray(card_ids).tolist():
+        best = None
+        for five in itertools.combinations(row, 5):
+            # reference_rank only depends on the values and on whether all suits are the same
+            memo_key = (tuple(sorted(card_id >> 2 for card_id in five)), len({card_id & 3 for card_id in five}) == 1)
+            rank = memo.get(memo_key)
+            if rank is None:
+                rank = memo[memo_key] = reference_rank([CARDS[card_id] for card_id in five])
+            if best is None or rank > best:
+                best = rank
+        keys.append(best)
+    order = {key: i for i, key in enumerate(sorted(set((k[0], tuple(k[1])) for k in keys)))}
+    return np.array([order[(k[0], tuple(k[1]))] for k in keys])
+
+
+def _scalar(evaluate):
+    """ Turns a function of a list of cards into a function of an (N, k) id array """
+    return lambda card_ids: np.array([evaluate([CARDS[i] for i in row]) for row in np.asarray(card_ids).tolist()])
+
+
+EVALUATORS = {
+    'evaluate_batch': lambda card_ids: evaluate_batch(card_ids)[0],
+    'evaluate_cards': _scalar(evaluate_cards),
+    'PokerHand': _scalar(lambda cards: PokerHand(cards).strength),
+}  #: Functions from an (N, k) array of card ids to N comparable strengths
+
+
+def ordering_mismatches(strengths, ranks):
+    """ Returns the indices of hands where the strengths don't order the hands like the reference ranks do.
+        Only the order matters, so any strength encoding can be checked against any reference.
+
+    :param strengths: (N,) strengths from the evaluator that is checked
+    :param ranks: (N,) reference ranks
+    :return: sorted array of hand indices, empty if the two orders agree
+    """
+    strengths, ranks = np.asarray(strengths), np.asarray(ranks)
+    unique_ranks, group = np.unique(ranks, return_inverse=True)
+    low = np.full(len(unique_ranks), np.iinfo(np.int64).max)
+    high = np.full(len(unique_ranks), np.iinfo(np.int64).min)
+    np.minimum.at(low, group, strengths)
+    np.maximum.at(high, group, strengths)
+    # Equal hands need equal strengths and every group must be stronger than the one below it
+    bad_groups = low != high
+    bad_groups[1:] |= low[1:] <= high[:-1]
+    bad_groups[:-1] |= low[1:] <= high[:-1]
+    return np.flatnonzero(bad_groups[group])
+
+
+def differential_check(evaluate, card_ids, ranks=None):
+    """ Checks an evaluator against the reference ranking on the given hands.
+
+    :param evaluate: function from an (N, k) id array to N strengths, e.g. a value in EVALUATORS
+    :param card_ids: (N, k) array with the hands to check
+    :param ranks: the reference ranks of the hands, computed with reference_ranks if None
+    :return: dict with the number of hands, the number of mismatches and a few mismatching hands
+    """
+    if ranks is None:
+        ranks = reference_ranks(card_ids)
+    mismatches = ordering_mismatches(evaluate(card_ids), ranks)
+    return {'hands': len(card_ids), 'mismatches': len(mismatches),
+            'examples': [np.asarray(card_ids)[i].tolist() for i in mismatches[:5]]}
+
+
+def random_hands(n, cards, rng):
+    """ Deals n random hands of the given number of cards as an (n, cards) id array """
+    return np.argsort(rng.random((n, 52)), axis=1)[:, :cards].astype(np.uint8)
+
+
+def hands_by_category(n, cards, rng):
+    """ Returns up to n random hands of each category as a dict from HandValue to an (m, cards) id array.
+        Rare categories are built from a five-card hand of that category plus random cards.
+    """
+    hands = random_hands(max(20 * n, 10000), cards, rng)
+    handtypes = evaluate_batch(hands)[1]
+    result = {}
+    five, five_handtypes = None, None
+    for handtype in HandValue:
+        found = hands[handtypes == handtype][:n]
+        if len(found) < n:
+            if five is None:
+                five = combination_indices(52, 5)
+                five_handtypes = evaluate_batch(five)[1]
+            rows = five[five_handtypes == handtype]
+            rows = rows[rng.integers(len(rows), size=4 * n)]
+            keys = rng.random((len(rows), 52))
+            np.put_along_axis(keys, rows.astype(np.int64), 2.0, axis=1)
+            built = np.concatenate((rows, np.argsort(keys, axis=1)[:, :cards - 5].astype(np.uint8)), axis=1)
+            built = built[evaluate_batch(built)[1] == handtype]
+            found = np.concatenate((found, built))[:n]
+        result[HandValue(handtype)] = found
+    return result
+
+
+def _rate(function, items, repeat):
+    """ Returns how many items per second function gets through, the best of repeat runs """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(items)
+        best = min(best, time.perf_counter() - start)
+    return len(items) / best if best > 0 else float('inf')
+
+
+def run_benchmarks(hands=2000, repeat=3, seed=44):
+    """ Measures hands per second of the evaluators for every hand category and for 5, 6 and 7 cards, plus deck
+        construction and hand comparison. The PokerHand cache is turned off while measuring.
+
+    :param hands: number of hands in each measurement
+    :param repeat: number of runs of each measurement, the fastest run counts
+    :param seed: seed of the random hands
+    :return: list of dicts with the benchmark name, number of cards, category and hands per second
+    """
+    rng = np.random.default_rng(seed)
+    results = []
+    cache_size = evaluation_cache.maxsize
+    evaluation_cache.resize(0)
+    try:
+        for cards in (5, 6, 7):
+            for handtype, ids in hands_by_category(hands, cards, rng).items():
+                card_lists = [[CARDS[i] for i in row] for row in ids.tolist()]
+                holes = []
+                for row in card_lists:
+                    hand = Hand()
+                    hand.add_card(row[0])
+                    hand.add_card(row[1])
+                    holes.append((hand, row[2:]))
+                measurements = {
+                    'evaluate_batch': (lambda items: evaluate_batch(items), ids),
+                    'evaluate_cards': (lambda items: [evaluate_cards(c) for c in items], card_lists),
+                    'PokerHand': (lambda items: [PokerHand(c) for c in items], card_lists),
+                    'best_poker_hand': (lambda items: [hand.best_poker_hand(table) for hand, table in items], holes),
+                }
+                for name, (function, items) in measurements.items():
+                    results.append({'benchmark': name, 'cards': cards, 'category': handtype.name,
+                                    'hands_per_second': _rate(function, items, repeat)})
+
+        poker_hands = [PokerHand([CARDS[i] for i in row]) for row in random_hands(hands, 7, rng).tolist()]
+        pairs = list(zip(poker_hands, poker_hands[1:] + poker_hands[:1]))
+        results.append({'benchmark': 'compare', 'cards': 7, 'category': None,
+                        'hands_per_second': _rate(lambda items: [a < b for a, b in items], pairs, repeat)})
+        results.append({'benchmark': 'StandardDeck', 'cards': 52, 'category': None,
+                        'hands_per_second': _rate(lambda items: [StandardDeck() for _ in items], range(hands), repeat)})
+    finally:
+        evaluation_cache.resize(cache_size)
+    return results
+
+
+def run_checks(samples=20000, exhaustive=True, evaluators=None, seed=44):
+    """ Checks the evaluators against the reference ranking on random 5, 6 and 7 card hands and, if exhaustive is
+        set, on all 2598960 five-card hands.
+
+    :param samples: number of random hands for each number of cards
+    :param exhaustive: also check every five-card hand (takes about a minute for the scalar evaluators)
+    :param evaluators: dict of evaluators to check, defaults to EVALUATORS
+    :param seed: seed of the random hands
+    :return: list of dicts with the evaluator, the hands checked and the number of mismatches
+    """
+    rng = np.random.default_rng(seed)
+    evaluators = EVALUATORS if evaluators is None else evaluators
+    hand_sets = [('random', cards, random_hands(samples, cards, rng)) for cards in (5, 6, 7)]
+    if exhaustive:
+        hand_sets.append(('exhaustive', 5, combination_indices(52, 5)))
+    results = []
+    for kind, cards, card_ids in hand_sets:
+        ranks = reference_ranks(card_ids)
+        for name, evaluate in evaluators.items():
+            result = differential_check(evaluate, card_ids, ranks)
+            results.append(dict(check=kind, evaluator=name, cards=cards, **result))
+    return results
+
+
+GAME_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'CA3_Resubmission')  #: Has pokermodel
+
+
+def import_time(module, path=None):
+    """ Measures how long importing a module takes in a new interpreter, from the output of python -X importtime.
+
+    :param module: name of the module
+    :param path: directory to run the interpreter in, e.g. GAME_DIR for pokermodel
+    :return: dict from the name of every module that was imported to its import time in microseconds, including
+        the modules it imported
+    """
+    output = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'], cwd=path,
+                            capture_output=True, text=True, check=True).stderr
+    times = {}
+    for line in output.splitlines():
+        # Lines look like "import time:       219 |        219 |     _sha512"
+        fields = line[len('import time:'):].split('|')
+        if line.startswith('import time:') and len(fields) == 3 and fields[1].strip().isdigit():
+            times[fields[2].strip()] = int(fields[1])
+    return times
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--hands', type=int, default=2000, help='hands in each speed measurement')
+    parser.add_argument('--samples', type=int, default=20000, help='random hands in each check')
+    parser.add_argument('--no-exhaustive', action='store_true', help='skip the check of all five-card hands')
+    parser.add_argument('--output', help='write the JSON results to this file')
+    args = parser.parse_args()
+
+    imports = {}
+    for module, path in (('cardlib', None), ('wire', None), ('equity', None), ('pokermodel', GAME_DIR)):
+        times = import_time(module, path)
+        imports[module] = {'microseconds': times[module], 'modules': len(times), 'numpy': 'numpy' in times,
+                           'qt': any(name.startswith('PyQt5') for name in times)}
+    report = {'python': platform.python_version(), 'numpy': np.__version__, 'time': time.time(),
+              'imports': imports,
+              'benchmarks': run_benchmarks(args.hands),
+              'checks': run_checks(args.samples, not args.no_exhaustive)}
+    text = json.dumps(report, indent=1)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(text)
+    else:
+        print(text)
+    sys.exit(1 if any(check['mismatches'] for check in report['checks']) else 0)
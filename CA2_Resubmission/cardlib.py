@@ -1,9 +1,15 @@
+import array
 import enum
 from enum import IntEnum
-import numpy as np
 import random
-from collections import Counter
+from collections import Counter, OrderedDict, namedtuple
+from collections.abc import Sequence
 import abc
+import itertools
+import os
+import sys
+
+# NumPy is imported inside the functions that use it, so importing cardlib doesn't load it
 
 
 @enum.unique
@@ -46,17 +52,55 @@ class HandValue(IntEnum):
 
 
 class PlayingCard(abc.ABC):  # Abstract base class, acting as blueprint for other classes
-    """ Parent class for the different types of playing cards"""
+    """ Parent class for the different types of playing cards.
+        Cards are immutable and interned, so there is only one object for every card. Each card carries an integer id
+        in 0-51 (4 * (value - 2) + suit) and a bitmask with only the bit of that id set.
+    """
+
+    __slots__ = ('value', 'suit', 'card_id', 'mask')
+    _interned = {}
+
+    def __new__(cls, value, suit):
+        key = (cls, value, int(suit))
+        card = PlayingCard._interned.get(key)
+        if card is None:
+            if not 2 <= value <= 14:
+                raise ValueError(f"{value} is not a card value, values go from 2 to 14")
+            card = super().__new__(cls)
+            card_id = 4 * (value - 2) + int(Suit(suit))
+            object.__setattr__(card, 'value', value)
+            object.__setattr__(card, 'suit', Suit(suit))
+            object.__setattr__(card, 'card_id', card_id)
+            object.__setattr__(card, 'mask', 1 << card_id)
+            PlayingCard._interned[key] = card
+        return card
+
+    def __init__(self, *args, **kwargs):
+        # Everything is set in __new__, this only accepts the same arguments
+        pass
+
+    def __setattr__(self, key, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
 
-    def __init__(self, suit):
-        self.value = None
-        self.suit = suit
+    def __reduce__(self):
+        return card_from_id, (self.card_id,)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
 
     def __lt__(self, other):
-        return self.get_value() < other.get_value()
+        return self.value < other.value
 
     def __eq__(self, other):
-        return self.get_value() == other.get_value()
+        if not isinstance(other, PlayingCard):
+            return NotImplemented
+        return self.value == other.value
+
+    # Cards that are equal can have different suits, so they can't be hashed consistently. Use card_id or mask as key
+    __hash__ = None
 
     @abc.abstractmethod
     def get_value(self):
@@ -70,10 +114,12 @@ class PlayingCard(abc.ABC):  # Abstract base class, acting as blueprint for othe
 class NumberedCard(PlayingCard):
     """ A class representing all the numbered cards e.g. card 2-10"""
 
-    def __init__(self, value: int, suit: Suit):
-        super().__init__(suit)
-        self.value = value
-        self.suit = suit
+    __slots__ = ()
+
+    def __new__(cls, value: int, suit: Suit):
+        if not 2 <= value <= 10:
+            raise ValueError(f"{value} is not the value of a numbered card, use JackCard and so on for 11 to 14")
+        return super().__new__(cls, value, suit)
 
     def get_value(self):
         return self.value
@@ -94,10 +140,11 @@ class JackCard(PlayingCard):
        :type suit: Suit
        """
 
-    def __init__(self, suit: Suit):
-        super().__init__(suit)
-        self.value = 11
-        self.name = 'Jack'
+    __slots__ = ()
+    name = 'Jack'
+
+    def __new__(cls, suit: Suit):
+        return super().__new__(cls, 11, suit)
 
     def get_value(self):
         return self.value
@@ -115,10 +162,11 @@ class JackCard(PlayingCard):
 class QueenCard(PlayingCard):
     """ A class that creates Queen playing cards"""
 
-    def __init__(self, suit: Suit):
-        super().__init__(suit)
-        self.value = 12
-        self.name = 'Queen'
+    __slots__ = ()
+    name = 'Queen'
+
+    def __new__(cls, suit: Suit):
+        return super().__new__(cls, 12, suit)
 
     def get_value(self):
         return self.value
@@ -136,10 +184,11 @@ class QueenCard(PlayingCard):
 class KingCard(PlayingCard):
     """ A class that creates King playing cards"""
 
-    def __init__(self, suit: Suit):
-        super().__init__(suit)
-        self.value = 13
-        self.name = 'King'
+    __slots__ = ()
+    name = 'King'
+
+    def __new__(cls, suit: Suit):
+        return super().__new__(cls, 13, suit)
 
     def get_value(self):
         return self.value
@@ -157,10 +206,11 @@ class KingCard(PlayingCard):
 class AceCard(PlayingCard):
     """ A class that creates Aces playing cards"""
 
-    def __init__(self, suit: Suit):
-        super().__init__(suit)
-        self.value = 14
-        self.name = "Ace"
+    __slots__ = ()
+    name = 'Ace'
+
+    def __new__(cls, suit: Suit):
+        return super().__new__(cls, 14, suit)
 
     def get_value(self):
         return self.value
@@ -175,33 +225,794 @@ class AceCard(PlayingCard):
         return 'Card(%r, %r)' % (self.get_value(), self.suit.name)
 
 
-class StandardDeck(object):
-    """This class is used for representing a standard deck of cards. The deck will contain 52 unique cards"""
+def _make_card(value, suit):
+    if value <= 10:
+        return NumberedCard(value, suit)
+    return {11: JackCard, 12: QueenCard, 13: KingCard, 14: AceCard}[value](suit)
+
+
+CARDS = tuple(_make_card(card_id // 4 + 2, Suit(card_id % 4)) for card_id in range(52))  #: All cards, indexed by id
 
-    def __init__(self):
-        self.deck = []
-        for i in range(2, 11):  # Adds the numbered cards
-            for j in Suit:
-                self.deck.append(NumberedCard(value=i, suit=j))
 
-        for i in Suit:  # Adds the pictured cards
-            self.deck.append(JackCard(suit=i))
-            self.deck.append(QueenCard(suit=i))
-            self.deck.append(KingCard(suit=i))
-            self.deck.append(AceCard(suit=i))
+def card_from_id(card_id):
+    """ Returns the card with the given id in 0-51 """
+    return CARDS[card_id]
 
-    def shuffle(self):
-        random.shuffle(self.deck)
+
+class CardView(Sequence):
+    """ Read-only view of the cards in a Hand or StandardDeck. It reads the card ids of its owner on every access, so
+        it always shows the current cards. Cards are added and removed through the owner, so changing the view
+        raises an error instead of being lost.
+
+    :param owner: object with a _card_ids method returning the current card ids
+    """
+
+    __slots__ = ('_owner',)
+    __hash__ = None
+
+    def __init__(self, owner):
+        self._owner = owner
+
+    def __len__(self):
+        return len(self._owner._card_ids())
+
+    def __getitem__(self, index):
+        ids = self._owner._card_ids()
+        if isinstance(index, slice):
+            return [CARDS[card_id] for card_id in ids[index].tolist()]
+        return CARDS[ids[index]]
+
+    def __iter__(self):
+        return iter([CARDS[card_id] for card_id in self._owner._card_ids().tolist()])
+
+    def copy(self):
+        """ Returns the cards as a new list """
+        return list(self)
+
+    def __add__(self, other):
+        return list(self) + list(other)
+
+    def __radd__(self, other):
+        return list(other) + list(self)
+
+    def __eq__(self, other):
+        if not isinstance(other, (CardView, list, tuple)):
+            return NotImplemented
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+class StandardDeck(object):
+    """This class is used for representing a standard deck of cards. The deck will contain 52 unique cards.
+    The cards are stored as a uint8 array of card ids where the cards left in the deck are the first ones, with the
+    top of the deck last, together with a bitmask of the cards left. deck is a read-only CardView of the cards left."""
+
+    # Numbered cards first, then the pictured cards suit by suit
+    _ORDER = tuple([NumberedCard(i, j).card_id for i in range(2, 11) for j in Suit] +
+                   [card(i).card_id for i in Suit for card in (JackCard, QueenCard, KingCard, AceCard)])
+    _order = None  # _ORDER as an array, made by the first deck
+
+    def __init__(self):
+        import numpy as np
+        if StandardDeck._order is None:
+            StandardDeck._order = np.array(self._ORDER, dtype=np.uint8)
+        self.ids = self._order.copy()
+        self.left = 52
+        self.mask = (1 << 52) - 1
+
+    @property
+    def deck(self):
+        return CardView(self)
+
+    @deck.setter
+    def deck(self, cards):
+        import numpy as np
+        self.ids = np.array([card.card_id for card in cards], dtype=np.uint8)
+        self.left = len(cards)
+        self.mask = 0
+        for card in cards:
+            self.mask |= card.mask
+
+    def _card_ids(self):
+        return self.ids[:self.left]
+
+    def __len__(self):
+        return self.left
+
+    def __bool__(self):
+        # An empty deck is still a deck
+        return True
+
+    def __contains__(self, card):
+        return bool(self.mask & card.mask)
+
+    @classmethod
+    def from_order(cls, order):
+        """ Creates a deck that deals the cards in the given order, e.g. a row from shuffled_decks
+
+        :param order: card ids, the first one is dealt first
+        """
+        import numpy as np
+        deck = cls.__new__(cls)
+        deck.ids = np.array(order, dtype=np.uint8)[::-1].copy()
+        deck.left = len(deck.ids)
+        deck.mask = 0
+        for card_id in deck.ids.tolist():
+            deck.mask |= 1 << card_id
+        return deck
+
+    def shuffle(self, rng=None):
+        """ Shuffles the cards left in the deck
+
+        :param rng: numpy Generator to shuffle with, the random module is used if it is None
+        """
+        if rng is not None:
+            self.ids[:self.left] = rng.permutation(self.ids[:self.left])
+            return
+        ids = self.ids[:self.left].tolist()
+        random.shuffle(ids)
+        self.ids[:self.left] = ids
 
     def draw(self):
-        if len(self.deck) > 0:
-            return self.deck.pop(-1)
+        if self.left > 0:
+            self.left -= 1
+            card = CARDS[self.ids[self.left]]
+            self.mask &= ~card.mask
+            return card
         else:
             raise IndexError("Deck is empty")  # Deck is empty
 
+    def deal(self, n):
+        """ Draws n cards at once
+
+        :param n: number of cards
+        :return: uint8 array with the ids of the cards, in the order draw would have returned them
+        """
+        if n > self.left:
+            raise IndexError("Not enough cards left in the deck")
+        dealt = self.ids[self.left - n:self.left][::-1].copy()
+        self.left -= n
+        for card_id in dealt.tolist():
+            self.mask &= ~(1 << card_id)
+        return dealt
+
+
+Deals = namedtuple('Deals', ['holes', 'flop', 'turn', 'river'])
+
+
+def random_generator(seed=None):
+    """ Returns np.random.default_rng(seed), for modules that don't import NumPy themselves """
+    import numpy as np
+    return np.random.default_rng(seed)
+
+
+def spawn_generators(seed, n):
+    """ Returns n independent numpy Generators derived from one seed, e.g. one for each worker process """
+    import numpy as np
+    return [np.random.default_rng(child) for child in np.random.SeedSequence(seed).spawn(n)]
+
+
+def shuffled_decks(m, rng=None, chunk_size=1 << 16):
+    """ Generates m independently shuffled decks at once
+
+    :param m: number of decks
+    :param rng: numpy Generator or seed, the same seed always gives the same decks
+    :param chunk_size: number of decks shuffled at once, bounds the temporary memory
+    :return: (m, 52) uint8 array of card ids, each row in the order the cards are dealt
+    """
+    import numpy as np
+    rng = np.random.default_rng(rng)
+    decks = np.empty((m, 52), dtype=np.uint8)
+    for start in range(0, m, chunk_size):
+        rows = min(chunk_size, m - start)
+        decks[start:start + rows] = np.argsort(rng.random((rows, 52)), axis=1)
+    return decks
+
+
+def deal_rounds(decks, players):
+    """ Splits shuffled decks into the cards of Texas hold'em rounds. The cards are dealt in the same order as
+        Poker.new_round and the table card methods do with StandardDeck.from_order: two cards to each player in
+        turn, then the flop, the turn and the river.
+
+    :param decks: (m, 52) array of card ids, e.g. from shuffled_decks
+    :param players: number of players
+    :return: Deals with holes (m, players, 2), flop (m, 3), turn (m,) and river (m,)
+    """
+    table = 2 * players
+    return Deals(decks[:, :table].reshape(len(decks), players, 2), decks[:, table:table + 3], decks[:, table + 3],
+                 decks[:, table + 4])
+
+
+# Hand evaluation tables. Sets of ranks are stored as 13-bit masks where bit (value - 2) is set for each value, and
+# hand strengths are integers with the HandValue in the top bits followed by five 4-bit card values:
+# strength = handtype << 20 | v1 << 16 | v2 << 12 | v3 << 8 | v4 << 4 | v5
+# so that comparing two strengths compares the hands, kickers included.
+
+def _build_rank_tables():
+    import numpy as np
+    masks = np.arange(1 << 13)
+    bits = (masks[:, None] >> np.arange(13)) & 1
+    popcount = bits.sum(axis=1)
+
+    # The five highest values of each mask, packed with the highest value in the most significant position
+    top5 = np.zeros(len(masks), dtype=np.int64)
+    taken = np.zeros(len(masks), dtype=np.int64)
+    for rank in range(12, -1, -1):
+        use = (bits[:, rank] == 1) & (taken < 5)
+        top5[use] |= (rank + 2) << (4 * (4 - taken[use]))
+        taken += use
+    highest = top5 >> 16
+
+    # The highest value of the best straight in each mask, the wheel A-2-3-4-5 counts as a five high straight
+    straight = np.zeros(len(masks), dtype=np.int64)
+    for high in range(5, 15):
+        if high == 5:
+            pattern = 0b1000000001111
+        else:
+            pattern = 0b11111 << (high - 6)
+        found = (masks & pattern) == pattern
+        straight[found] = high
+    return popcount.astype(np.int32), highest.astype(np.int32), top5.astype(np.int32), straight.astype(np.int32)
+
+
+RANK_TABLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rank_tables_v1.npy')
+
+
+def load_rank_tables(filename=RANK_TABLE_FILE):
+    """ Returns the four rank tables memory-mapped read-only from filename. The first process that finds the file
+        missing builds the tables and saves them, every later process (e.g. each worker of a process pool) only maps
+        the file, so the operating system keeps one copy of the tables for all of them. If the file can't be written,
+        the tables are built and kept in memory.
+
+    :param filename: the table file, its name has a version number that must change when the tables change
+    :return: tuple of the popcount, highest, top5 and straight tables
+    """
+    import numpy as np
+    try:
+        tables = np.load(filename, mmap_mode='r')
+        if tables.shape == (4, 1 << 13) and tables.dtype == np.int32:
+            return tuple(tables)
+    except (OSError, ValueError):
+        pass
+    tables = np.stack(_build_rank_tables())
+    temporary = f'{filename}.{os.getpid()}.tmp'
+    try:
+        with open(temporary, 'wb') as file:
+            np.save(file, tables)
+        # Replacing the file in one step means no process ever maps a half written file
+        os.replace(temporary, filename)
+        return tuple(np.load(filename, mmap_mode='r'))
+    except OSError:
+        return tuple(tables)
+
+
+def _load_rank_lists(filename=RANK_TABLE_FILE):
+    """ Returns the four rank tables as Python lists. They are read straight from the table file with the array
+        module, so NumPy is only needed the first time, to build the file.
+    """
+    try:
+        with open(filename, 'rb') as file:
+            data = file.read()
+        # An .npy file is a magic string, a version, the header length and a header describing the data
+        header_end = 10 + int.from_bytes(data[8:10], 'little')
+        header = data[10:header_end]
+        values = array.array('i')
+        values.frombytes(data[header_end:])
+        if (data[:8] == b'\x93NUMPY\x01\x00' and b"'<i4'" in header and b'(4, 8192)' in header and
+                values.itemsize == 4 and len(values) == 4 << 13):
+            if sys.byteorder == 'big':
+                values.byteswap()
+            values = values.tolist()
+            return [values[i << 13:(i + 1) << 13] for i in range(4)]
+    except (OSError, ValueError):
+        pass
+    return [table.tolist() for table in load_rank_tables(filename)]
+
+
+_rank_arrays = None
+_RANK_TABLE_NAMES = ('POPCOUNT_TABLE', 'HIGHEST_TABLE', 'TOP5_TABLE', 'STRAIGHT_TABLE')
+
+
+def rank_tables():
+    """ Returns the popcount, highest, top5 and straight tables as NumPy arrays, mapping the table file the first
+        time. They are also available as the module attributes POPCOUNT_TABLE, HIGHEST_TABLE, TOP5_TABLE and
+        STRAIGHT_TABLE.
+    """
+    global _rank_arrays
+    if _rank_arrays is None:
+        _rank_arrays = load_rank_tables()
+    return _rank_arrays
+
+
+def __getattr__(name):
+    # The NumPy tables are loaded when they are first used, not when cardlib is imported
+    if name in _RANK_TABLE_NAMES:
+        return rank_tables()[_RANK_TABLE_NAMES.index(name)]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Python lists are much faster than arrays for single lookups
+_POPCOUNT, _HIGHEST, _TOP5, _STRAIGHT = _load_rank_lists()
+
+
+def evaluate_masks(layers, suit_masks, suit_counts):
+    """ Computes the strength of a set of cards from its rank masks.
+
+    :param layers: four rank masks, layers[k] has the values that appear more than k times
+    :param suit_masks: rank mask for each suit
+    :param suit_counts: number of cards of each suit
+    :return: integer hand strength
+    """
+    for suit_mask, suit_count in zip(suit_masks, suit_counts):
+        if suit_count >= 5:
+            straight_high = _STRAIGHT[suit_mask]
+            if straight_high:
+                return 9 << 20 | straight_high << 16
+            flush = 6 << 20 | _TOP5[suit_mask]
+            break
+    else:
+        flush = 0
+
+    ranks, pairs, trips, quads = layers
+    if quads:
+        value = _HIGHEST[quads]
+        return 8 << 20 | value << 16 | _HIGHEST[ranks & ~(1 << (value - 2))] << 12
+    if trips:
+        value = _HIGHEST[trips]
+        others = pairs & ~(1 << (value - 2))
+        if others:
+            return 7 << 20 | value << 16 | _HIGHEST[others] << 12
+    if flush:
+        return flush
+    straight_high = _STRAIGHT[ranks]
+    if straight_high:
+        return 5 << 20 | straight_high << 16
+    if trips:
+        return 4 << 20 | value << 16 | (_TOP5[ranks & ~(1 << (value - 2))] >> 12) << 8
+    if pairs:
+        value = _HIGHEST[pairs]
+        rest = pairs & ~(1 << (value - 2))
+        if rest:
+            second = _HIGHEST[rest]
+            kicker = _HIGHEST[ranks & ~(1 << (value - 2)) & ~(1 << (second - 2))]
+            return 3 << 20 | value << 16 | second << 12 | kicker << 8
+        return 2 << 20 | value << 16 | (_TOP5[ranks & ~(1 << (value - 2))] >> 8) << 4
+    return 1 << 20 | _TOP5[ranks]
+
+
+def evaluate_cards(cards):
+    """ Computes the strength of the best poker hand in a set of cards with a few table lookups.
+        Any number of cards can be given, hands with fewer than five cards are ranked on the cards they have.
+
+    :param cards: the cards to evaluate
+    :return: integer hand strength, a higher strength is a better hand
+    """
+    suit_masks = [0, 0, 0, 0]
+    for card in cards:
+        card_id = card.card_id
+        suit_masks[card_id & 3] |= 1 << (card_id >> 2)
+    s0, s1, s2, s3 = suit_masks
+    suit_counts = [_POPCOUNT[s0], _POPCOUNT[s1], _POPCOUNT[s2], _POPCOUNT[s3]]
+
+    if sum(suit_counts) == len(cards):
+        # All cards are different, so the number of times a value appears is the number of suits it appears in
+        s01, s23 = s0 & s1, s2 & s3
+        layers = [s0 | s1 | s2 | s3, s01 | s23 | ((s0 | s1) & (s2 | s3)), (s01 & (s2 | s3)) | (s23 & (s0 | s1)),
+                  s01 & s23]
+        return evaluate_masks(layers, suit_masks, suit_counts)
+
+    # The same card appears more than once, count every copy
+    layers = [0, 0, 0, 0]
+    suit_counts = [0, 0, 0, 0]
+    for card in cards:
+        bit = 1 << (card.card_id >> 2)
+        suit_counts[card.card_id & 3] += 1
+        for layer in range(4):
+            if not layers[layer] & bit:
+                layers[layer] |= bit
+                break
+    return evaluate_masks(layers, suit_masks, suit_counts)
+
+
+class HandState(object):
+    """ Evaluator state of a growing set of cards, e.g. a player's hole cards plus the table cards dealt so far.
+        The rank masks, suit masks and suit counts are updated in constant time for each added card, so the
+        strength of the best poker hand is always available without evaluating all the cards again.
+
+    :param cards: the cards to start with
+    """
+
+    def __init__(self, cards=()):
+        self.layers = [0, 0, 0, 0]  # layers[k] has the values that appear more than k times
+        self.suit_masks = [0, 0, 0, 0]
+        self.suit_counts = [0, 0, 0, 0]
+        self.size = 0
+        self.strength = evaluate_masks(self.layers, self.suit_masks, self.suit_counts)
+        for card in cards:
+            self.add_card(card)
+
+    def add_card(self, card):
+        """ Adds a card and updates the strength """
+        bit = 1 << (card.card_id >> 2)
+        suit = card.card_id & 3
+        layers = self.layers
+        for layer in range(4):
+            if not layers[layer] & bit:
+                layers[layer] |= bit
+                break
+        self.suit_masks[suit] |= bit
+        self.suit_counts[suit] += 1
+        self.size += 1
+        self.strength = evaluate_masks(layers, self.suit_masks, self.suit_counts)
+
+    @property
+    def handtype(self):
+        """ HandValue of the best poker hand, None before any card is added """
+        return HandValue(self.strength >> 20) if self.size else None
+
+    def copy(self):
+        state = HandState.__new__(HandState)
+        state.layers = list(self.layers)
+        state.suit_masks = list(self.suit_masks)
+        state.suit_counts = list(self.suit_counts)
+        state.size = self.size
+        state.strength = self.strength
+        return state
+
+    def __lt__(self, other):
+        return self.strength < other.strength
+
+    def __eq__(self, other):
+        return self.strength == other.strength
+
+
+class EvaluationCache(object):
+    """ Bounded memo of hand strengths keyed by the mask of the cards, so the order of the cards doesn't matter and
+        evaluating a set of cards again is a single dict lookup. When more than maxsize strengths are stored, the
+        least recently used one is dropped. Card sets with repeated cards are evaluated but never stored.
+
+    :param maxsize: maximum number of stored strengths, 0 turns the cache off
+    """
+
+    def __init__(self, maxsize=1 << 16):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._strengths = OrderedDict()
+
+    @property
+    def enabled(self):
+        return self.maxsize > 0
+
+    def strength(self, cards):
+        """ Returns the same strength as evaluate_cards(cards), from the cache if the cards were seen before """
+        if not self.maxsize:
+            return evaluate_cards(cards)
+        mask = 0
+        for card in cards:
+            mask |= card.mask
+        if bin(mask).count('1') != len(cards):
+            # A repeated card has the same mask as the cards without it, so the cache can't be used
+            return evaluate_cards(cards)
+        strength = self._strengths.get(mask)
+        if strength is not None:
+            self.hits += 1
+            self._strengths.move_to_end(mask)
+            return strength
+        self.misses += 1
+        strength = self._strengths[mask] = evaluate_cards(cards)
+        if len(self._strengths) > self.maxsize:
+            self._strengths.popitem(last=False)
+        return strength
+
+    def resize(self, maxsize):
+        """ Changes the maximum number of stored strengths, dropping the least recently used ones if needed """
+        self.maxsize = maxsize
+        while len(self._strengths) > maxsize:
+            self._strengths.popitem(last=False)
+
+    def clear(self):
+        """ Removes all stored strengths and resets the counters """
+        self._strengths.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._strengths)
+
+
+evaluation_cache = EvaluationCache()  #: Used by PokerHand, call evaluation_cache.resize(0) to turn it off
+
+
+def _value_bit(values):
+    """ Returns the rank mask bit of an array of card values, 0 where the value is 0 """
+    import numpy as np
+    return np.where(values > 0, 1 << np.maximum(values - 2, 0), 0)
+
+
+def evaluate_masks_batch(layers, flush_mask):
+    """ Vectorized version of evaluate_masks.
+
+    :param layers: four arrays of rank masks, layers[k] has the values that appear more than k times
+    :param flush_mask: array with the rank mask of the suit with five or more cards, 0 where there is no flush
+    :return: array of integer hand strengths
+    """
+    import numpy as np
+    _, highest_table, top5_table, straight_table = rank_tables()
+    ranks, pairs, trips, quads = layers
+    straight_flush = straight_table[flush_mask]
+    straight = straight_table[ranks]
+
+    quad_value = highest_table[quads]
+    trip_value = highest_table[trips]
+    other_pairs = pairs & ~_value_bit(trip_value)
+    pair_value = highest_table[pairs]
+    second_pair = highest_table[pairs & ~_value_bit(pair_value)]
+    pair_bits = _value_bit(pair_value) | _value_bit(second_pair)
+
+    conditions = [straight_flush > 0, quads > 0, (trips > 0) & (other_pairs > 0), flush_mask > 0, straight > 0,
+                  trips > 0, second_pair > 0, pairs > 0]
+    choices = [
+        9 << 20 | straight_flush << 16,
+        8 << 20 | quad_value << 16 | highest_table[ranks & ~_value_bit(quad_value)] << 12,
+        7 << 20 | trip_value << 16 | highest_table[other_pairs] << 12,
+        6 << 20 | top5_table[flush_mask],
+        5 << 20 | straight << 16,
+        4 << 20 | trip_value << 16 | (top5_table[ranks & ~_value_bit(trip_value)] >> 12) << 8,
+        3 << 20 | pair_value << 16 | second_pair << 12 | highest_table[ranks & ~pair_bits] << 8,
+        2 << 20 | pair_value << 16 | (top5_table[ranks & ~_value_bit(pair_value)] >> 8) << 4,
+    ]
+    return np.select(conditions, choices, default=1 << 20 | top5_table[ranks])
+
+
+def evaluate_batch(card_ids, chunk_size=1 << 16):
+    """ Evaluates many hands at once without creating any card or hand objects.
+        The hands are handled chunk_size rows at a time so the temporary arrays stay small for any number of hands.
+
+    :param card_ids: array of shape (N, k) with card ids in 0-51, 5 <= k <= 9 and no card repeated within a row
+    :param chunk_size: number of hands evaluated at once
+    :return: (N,) int32 array of hand strengths and (N,) uint8 array of HandValue categories
+    """
+    import numpy as np
+    popcount_table = rank_tables()[0]
+    card_ids = np.asarray(card_ids)
+    strengths = np.empty(len(card_ids), dtype=np.int32)
+    for start in range(0, len(card_ids), chunk_size):
+        chunk = card_ids[start:start + chunk_size].astype(np.int32)
+        bits = 1 << (chunk >> 2)
+        suits = chunk & 3
+        s0, s1, s2, s3 = (np.bitwise_or.reduce(np.where(suits == suit, bits, 0), axis=1) for suit in range(4))
+        s01, s23 = s0 & s1, s2 & s3
+        layers = [s0 | s1 | s2 | s3, s01 | s23 | ((s0 | s1) & (s2 | s3)), (s01 & (s2 | s3)) | (s23 & (s0 | s1)),
+                  s01 & s23]
+        flush_mask = np.zeros(len(chunk), dtype=np.int32)
+        for suit_mask in (s0, s1, s2, s3):
+            flush_mask = np.where(popcount_table[suit_mask] >= 5, suit_mask, flush_mask)
+        strengths[start:start + chunk_size] = evaluate_masks_batch(layers, flush_mask)
+    return strengths, (strengths >> 20).astype(np.uint8)
+
+
+def combination_indices(n, k):
+    """ Returns all k-element subsets of range(n) as rows of an array, in lexicographic order
+
+    :param n: number of elements to choose from
+    :param k: number of elements in each subset
+    :return: array of shape (C(n, k), k)
+    """
+    import numpy as np
+    if k == 0:
+        return np.zeros((1, 0), dtype=np.int64)
+    combinations = np.arange(max(n - k + 1, 0))[:, None]
+    for position in range(1, k):
+        last = combinations[:, -1]
+        # The next element can be anything after the last one that still leaves room for the remaining elements
+        counts = n - k + position - last
+        starts = np.repeat(last + 1, counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        combinations = np.column_stack((np.repeat(combinations, counts, axis=0), starts + offsets))
+    return combinations.reshape(-1, k)
+
+
+SUIT_PERMUTATIONS = tuple(itertools.permutations(range(4)))  #: All 24 ways to relabel the suits
+
+
+def canonical_situation(groups):
+    """ Maps a situation to its suit-isomorphic representative. Two situations that only differ by a relabeling of
+        the suits (e.g. hearts and spades swapped everywhere) get the same representative.
+
+    :param groups: sequence of card groups, e.g. each player's hole cards followed by the table cards.
+        The order of the groups matters but the order of the cards within a group doesn't.
+    :return: the representative as a tuple with a sorted tuple of card ids for each group, and the suit
+        permutation that maps the cards onto it (suit s becomes permutation[s])
+    """
+    ids = [[card.card_id for card in group] for group in groups]
+    best = None
+    for permutation in SUIT_PERMUTATIONS:
+        form = tuple(tuple(sorted(card_id & ~3 | permutation[card_id & 3] for card_id in group)) for group in ids)
+        if best is None or form < best[0]:
+            best = form, permutation
+    return best
+
+
+def card_ids(cards):
+    """ Returns the ids of a list of cards as a uint8 array """
+    import numpy as np
+    return np.fromiter((card.card_id for card in cards), dtype=np.uint8, count=len(cards))
+
+
+def strength_handtype(strength):
+    """ Returns the HandValue of an integer hand strength """
+    return HandValue(strength >> 20)
+
+
+# Poker variants. Texas hold'em uses the best five of all seven cards, Omaha uses exactly two of the four hole cards
+# and three table cards, and short-deck hold'em plays without the 2-5 cards, where a flush beats a full house and
+# A-6-7-8-9 is the lowest straight.
+
+Variant = namedtuple('Variant', ['name', 'hole_cards', 'hole_used', 'lowest_value'])
+Variant.__doc__ = """ Rules of a poker variant: the number of hole cards, how many of them a hand must use (None for any
+    number) and the lowest card value in the deck """
+
+VARIANTS = {
+    'holdem': Variant('holdem', 2, None, 2),
+    'omaha': Variant('omaha', 4, 2, 2),
+    'shortdeck': Variant('shortdeck', 2, None, 6),
+}
+
+_SHORT_DECK_WHEEL = 1 << 12 | 0b1111 << 4  # A-6-7-8-9
+_SHORT_DECK_ORDER = (0, 1, 2, 3, 4, 5, 7, 6, 8, 9)  # Flush and full house swap places
+_combination_tables = {}
+_split_tables = {}
+
+
+def variant_deck(variant):
+    """ Returns the card ids of the deck of a variant """
+    import numpy as np
+    return np.arange(4 * (variant.lowest_value - 2), 52, dtype=np.uint8)
+
+
+def combination_table(hole_cards, board_cards, hole_used=None):
+    """ Returns the legal five card combinations of a hand as indices into a row of hole card ids followed by board
+        card ids. The tables are built once and shared.
+
+    :param hole_cards: number of hole cards
+    :param board_cards: number of board cards
+    :param hole_used: exact number of hole cards in each combination, None for any number
+    :return: (combinations, 5) int array
+    """
+    import numpy as np
+    key = (hole_cards, board_cards, hole_used)
+    if key not in _combination_tables:
+        if hole_used is None:
+            table = combination_indices(hole_cards + board_cards, 5)
+        else:
+            holes = combination_indices(hole_cards, hole_used)
+            boards = combination_indices(board_cards, 5 - hole_used) + hole_cards
+            table = np.concatenate((np.repeat(holes, len(boards), axis=0), np.tile(boards, (len(holes), 1))), axis=1)
+        table.flags.writeable = False
+        _combination_tables[key] = table
+    return _combination_tables[key]
+
+
+def _multiset_index(k):
+    """ Returns an array of shape (13,) * k that maps k card values (0-12, in any order) to the index of their
+        multiset, and the values of each multiset as rows
+    """
+    import numpy as np
+    multisets = np.array(list(itertools.combinations_with_replacement(range(13), k)), dtype=np.int64).reshape(-1, k)
+    index = np.zeros((13,) * k, dtype=np.int64)
+    for i, values in enumerate(multisets):
+        for order in itertools.permutations(values):
+            index[order] = i
+    return index, multisets
+
+
+def _split_table(first, second):
+    """ Returns the strength of every pair of value multisets with first and second values, not counting flushes,
+        with the multiset indices of both sizes
+    """
+    import numpy as np
+    if (first, second) not in _split_tables:
+        first_index, first_sets = _multiset_index(first)
+        second_index, second_sets = _multiset_index(second)
+        counts = (np.eye(13, dtype=np.int64)[first_sets].sum(axis=1)[:, None] +
+                  np.eye(13, dtype=np.int64)[second_sets].sum(axis=1)[None, :])
+        # layers[k] has the values that appear more than k times, impossible combinations get some strength
+        layers = [((counts > k) << np.arange(13)).sum(axis=2) for k in range(4)]
+        table = evaluate_masks_batch(layers, np.zeros_like(layers[0])).astype(np.int32)
+        _split_tables[first, second] = table, first_index, second_index
+    return _split_tables[first, second]
+
+
+def _evaluate_split(holes, boards, hole_used):
+    """ Evaluates hands that use exactly hole_used hole cards with a table lookup for the values of each pair of hole
+        and board card groups, adding flushes where both groups are of the same suit.
+    """
+    import numpy as np
+    n = len(holes)
+    hole_groups = holes[:, combination_indices(holes.shape[1], hole_used)].astype(np.int64)
+    board_groups = boards[:, combination_indices(boards.shape[1], 5 - hole_used)].astype(np.int64)
+    table, hole_index, board_index = _split_table(hole_used, 5 - hole_used)
+    hole_keys = hole_index[tuple(np.moveaxis(hole_groups >> 2, -1, 0))]
+    board_keys = board_index[tuple(np.moveaxis(board_groups >> 2, -1, 0))]
+    strengths = table[hole_keys[:, :, None], board_keys[:, None, :]]
+
+    def group_suit(groups, missing):
+        suits = groups & 3
+        return np.where((suits == suits[..., :1]).all(axis=-1), suits[..., 0], missing)
+
+    flush = group_suit(hole_groups, -1)[:, :, None] == group_suit(board_groups, -2)[:, None, :]
+    if flush.any():
+        masks = (np.bitwise_or.reduce(1 << (hole_groups >> 2), axis=-1)[:, :, None] |
+                 np.bitwise_or.reduce(1 << (board_groups >> 2), axis=-1)[:, None, :])
+        _, _, top5_table, straight_table = rank_tables()
+        straight = straight_table[masks]
+        flush_strengths = np.where(straight > 0, 9 << 20 | straight << 16, 6 << 20 | top5_table[masks])
+        strengths = np.where(flush, flush_strengths, strengths)
+    return strengths.reshape(n, -1)
+
+
+def _evaluate_short_deck(card_ids):
+    """ Evaluates five card hands with the short-deck ranking, where categories are numbered as in
+        _SHORT_DECK_ORDER
+    """
+    import numpy as np
+    strengths = evaluate_batch(card_ids)[0]
+    values = np.bitwise_or.reduce(1 << (card_ids.astype(np.int64) >> 2), axis=1)
+    suits = card_ids & 3
+    wheel = values == _SHORT_DECK_WHEEL
+    suited = (suits == suits[:, :1]).all(axis=1)
+    strengths = np.where(wheel, np.where(suited, 9 << 20 | 5 << 16, 5 << 20 | 5 << 16), strengths)
+    return np.array(_SHORT_DECK_ORDER)[strengths >> 20] << 20 | (strengths & 0xFFFFF)
+
+
+def evaluate_variant(holes, boards, variant='holdem', return_best=False):
+    """ Evaluates many hands of a poker variant at once. Hold'em hands are evaluated directly, Omaha hands through
+        value tables for each pair of two hole and three board cards, and other variants by evaluating every legal
+        five card combination from combination_table in one batch.
+
+    :param holes: (N, hole cards) array of hole card ids
+    :param boards: (N, board cards) array of board card ids, three to five cards
+    :param variant: a Variant or the name of one in VARIANTS
+    :param return_best: also return the index of the best combination in combination_table for each hand
+    :return: (N,) int32 strengths, which only compare hands of the same variant, and (N,) uint8 HandValue categories
+        (and the best combination indices)
+    """
+    import numpy as np
+    if isinstance(variant, str):
+        variant = VARIANTS[variant]
+    holes, boards = np.asarray(holes, dtype=np.uint8), np.asarray(boards, dtype=np.uint8)
+    if holes.shape[1] != variant.hole_cards:
+        raise ValueError(f"{variant.name} hands have {variant.hole_cards} hole cards")
+    if variant.hole_used is None and variant.lowest_value == 2 and not return_best:
+        return evaluate_batch(np.concatenate((holes, boards), axis=1))
+
+    if variant.hole_used is not None and variant.lowest_value == 2:
+        strengths = _evaluate_split(holes, boards, variant.hole_used)
+    else:
+        table = combination_table(holes.shape[1], boards.shape[1], variant.hole_used)
+        rows = np.concatenate((holes, boards), axis=1)[:, table].reshape(-1, 5)
+        if variant.lowest_value == 2:
+            strengths = evaluate_batch(rows)[0]
+        else:
+            strengths = _evaluate_short_deck(rows)
+        strengths = strengths.reshape(len(holes), -1)
+    best = strengths.argmax(axis=1)
+    strengths = strengths[np.arange(len(holes)), best].astype(np.int32)
+    handtypes = (strengths >> 20).astype(np.uint8)
+    if variant.lowest_value != 2:
+        handtypes = np.array(_SHORT_DECK_ORDER, dtype=np.uint8)[handtypes]
+    if return_best:
+        return strengths, handtypes, best
+    return strengths, handtypes
+
 
 class Hand(object):
-    """This class represent a hand with cards"""
+    """This class represent a hand with cards.
+    The cards are stored as an ordered uint8 array of card ids and a bitmask of the ids, cards is a read-only
+    CardView of them. Membership tests and unions use the bitmask."""
 
     def __init__(self, cards=None):
         if cards is None:
@@ -209,28 +1020,106 @@ class Hand(object):
         else:
             self.cards = cards
 
+    @property
+    def cards(self):
+        return CardView(self)
+
+    @cards.setter
+    def cards(self, cards):
+        import numpy as np
+        self._ids = np.zeros(max(len(cards), 8), dtype=np.uint8)
+        self._size = 0
+        self.mask = 0
+        for card in cards:
+            self.add_card(card)
+
+    @property
+    def ids(self):
+        return self._ids[:self._size]
+
+    def _card_ids(self):
+        return self._ids[:self._size]
+
+    def __len__(self):
+        return self._size
+
+    def __bool__(self):
+        # An empty hand is still a hand
+        return True
+
+    def __iter__(self):
+        return iter(self.cards)
+
+    def __contains__(self, card):
+        return bool(self.mask & card.mask)
+
     def add_card(self, card):
-        self.cards.append(card)
+        if self._size == len(self._ids):
+            import numpy as np
+            self._ids = np.concatenate((self._ids, np.zeros(len(self._ids), dtype=np.uint8)))
+        self._ids[self._size] = card.card_id
+        self._size += 1
+        self.mask |= card.mask
+
+    def _set_ids(self, ids):
+        import numpy as np
+        self._ids = np.concatenate((ids, np.zeros(max(8 - len(ids), 0), dtype=np.uint8)))
+        self._size = len(ids)
+        self.mask = 0
+        for card_id in ids.tolist():
+            self.mask |= 1 << card_id
 
     def drop_cards(self, indices: list[int]):
-        self.cards = np.delete(self.cards, indices)
+        import numpy as np
+        self._set_ids(np.delete(self.ids, indices))
+
+    def remove_card(self, card):
+        import numpy as np
+        if not self.mask & card.mask:
+            raise ValueError(f"{card} is not in the hand")
+        self.drop_cards([int(np.argmax(self.ids == card.card_id))])
 
     def clear_hand(self):
-        self.cards = []
+        self._size = 0
+        self.mask = 0
 
     def sort(self):
-        self.cards.sort()
+        import numpy as np
+        self._set_ids(self.ids[np.argsort(self.ids >> 2, kind='stable')])
+
+    def union(self, cards):
+        """ Returns a new hand with the cards of this hand followed by the given cards
+
+        :param cards: Hand or list of cards
+        """
+        import numpy as np
+        union = Hand()
+        other = cards.ids if isinstance(cards, Hand) else np.array([card.card_id for card in cards], dtype=np.uint8)
+        union._set_ids(np.concatenate((self.ids, other)))
+        return union
 
-    def best_poker_hand(self, table_cards=None):
+    def best_poker_hand(self, table_cards=None, variant=None):
         """
         This function determines the best pokerhand that a hand can achieve
         :param table_cards: Cards that is shared by all players and can be used to create a pokerhand
+        :param variant: None to use any of the cards, or a Variant (or its name in VARIANTS) for its rules. Then
+            the pokerhand has the five cards of the best legal combination and a strength that only compares
+            pokerhands of the same variant.
         :return: The pokerhand with the highest rank and the highest card
         """
         if table_cards is None:
             table_cards = []
-        all_cards = self.cards + table_cards
-        ph = PokerHand(all_cards)
+        all_cards = self.cards + list(table_cards)
+        if variant is None:
+            return PokerHand(all_cards)
+        if isinstance(variant, str):
+            variant = VARIANTS[variant]
+        strengths, handtypes, best = evaluate_variant(self.ids[None], card_ids(table_cards)[None], variant,
+                                                      return_best=True)
+        table = combination_table(len(self), len(table_cards), variant.hole_used)
+        ph = PokerHand([all_cards[i] for i in table[best[0]]])
+        ph.strength = int(strengths[0])
+        ph.handtype = HandValue(int(handtypes[0]))
         return ph
 
     def __str__(self):
@@ -238,29 +1127,27 @@ class Hand(object):
 
 
 class PokerHand(object):
-    """ This class is used to declare the different available poker-hands through static methods"""
+    """ This class is used to declare the different available poker-hands through static methods.
+        Every PokerHand has an integer strength that orders all hands completely, kickers included, so comparing,
+        sorting and picking the best of several hands only compares integers.
+    """
 
     def __init__(self, cards):
         self.handtype = None
         self.highest_card = None
+        self.strength = None
         self.cards = cards
         self.check()
 
     def check(self):
         """
-        This method loops through the static methods until it finds the best pokerhand
+        This method finds the best pokerhand through the evaluation tables
         :return: Best pokerhand and the highest card in that hand
         :type: tuple
         """
-        list_of_functions = [PokerHand.straightflush, PokerHand.fourofakind, PokerHand.fullhouse, PokerHand.flush,
-                             PokerHand.straight, PokerHand.threeofakind, PokerHand.twopair, PokerHand.onepair,
-                             PokerHand.highcard]
-
-        for func, val in zip(list_of_functions, HandValue):
-            self.handtype = val
-            if func(self.cards):
-                self.highest_card = self.highcard(self.cards)
-                break
+        self.strength = evaluation_cache.strength(self.cards)
+        self.handtype = HandValue(self.strength >> 20)
+        self.highest_card = max(card.value for card in self.cards) if self.cards else None
         return self.handtype, self.highest_card
 
     @staticmethod
@@ -376,16 +1263,10 @@ class PokerHand(object):
         return False
 
     def __lt__(self, other):
-        if self.handtype in [1, 2, 3, 4, 8]:  # Only compare highcard if type is less than five cards
-            return [self.handtype, self.highest_card] < [other.handtype, other.highest_card]
-        else:
-            return self.handtype < other.handtype
+        return self.strength < other.strength  # The strength includes the hand type and all kickers
 
     def __eq__(self, other):
-        if self.handtype in [1, 2, 3, 4, 8]:  # Only compare highcard if type is less than five cards
-            return [self.handtype, self.highest_card] == [other.handtype, other.highest_card]
-        else:
-            return self.handtype == other.handtype
+        return self.strength == other.strength
 
     def __str__(self):
         return f"Pokerhand type: {self.handtype.name} with cards: {self.cards}".replace("Card", "")
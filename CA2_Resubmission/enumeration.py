@@ -0,0 +1,117 @@
+"""Exhaustive enumeration of all hands of a given size, tabulating how often every category and strength occurs.
+
+Run ``python enumeration.py`` to go through all 133784560 seven-card hands. The hands are split into tasks by
+their lowest cards, the tasks run in a process pool and progress is saved to a checkpoint file every few seconds,
+so an interrupted run continues where it stopped.
+"""
+import argparse
+import os
+import time
+from collections import namedtuple
+from math import comb
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from cardlib import HandValue, evaluate_batch, combination_indices
+
+EnumerationResult = namedtuple('EnumerationResult', ['categories', 'strengths', 'counts', 'hands', 'seconds'])
+EnumerationResult.__doc__ = """ Result of enumerate_hands: the number of hands in each category indexed by HandValue
+    (index 0 is unused), every strength that occurs in increasing order with its number of hands, the total number of
+    hands and the time the enumeration took """
+
+
+def enumeration_tasks(cards):
+    """ Splits all hands of the given size into tasks, one for each choice of the lowest cards, so each task has at
+        most C(51, 4) hands. Each task is a tuple of those lowest card ids.
+    """
+    prefix = max(cards - 4, 0)
+    # The lowest cards have to leave enough higher cards for the rest of the hand
+    return [tuple(task) for task in combination_indices(52 - (cards - prefix), prefix).tolist()]
+
+
+def _count_task(task, cards):
+    """ Evaluates every hand whose lowest cards are task, returning the category counts and the counted strengths """
+    start = task[-1] + 1 if task else 0
+    rest = combination_indices(52 - start, cards - len(task)).astype(np.uint8) + start
+    hands = np.concatenate((np.broadcast_to(np.array(task, dtype=np.uint8), (len(rest), len(task))), rest), axis=1)
+    strengths, handtypes = evaluate_batch(hands)
+    unique, counts = np.unique(strengths, return_counts=True)
+    return np.bincount(handtypes, minlength=10), unique, counts
+
+
+def _merge(strengths, counts, new_strengths, new_counts):
+    """ Adds counted strengths to the running counts """
+    merged, inverse = np.unique(np.concatenate((strengths, new_strengths)), return_inverse=True)
+    total = np.zeros(len(merged), dtype=np.int64)
+    np.add.at(total, inverse, np.concatenate((counts, new_counts)))
+    return merged, total
+
+
+def enumerate_hands(cards=7, workers=None, checkpoint=None, checkpoint_interval=10.0, progress=None):
+    """ Evaluates every hand with the given number of cards and counts the categories and strengths.
+
+    :param cards: number of cards in each hand, 5 to 9
+    :param workers: number of processes, None for all cpus and 1 to run in this process
+    :param checkpoint: file the progress is saved to and resumed from, None to not save progress
+    :param checkpoint_interval: seconds between saves of the checkpoint
+    :param progress: function called as progress(hands done, hands in total, hands per second) after each save
+    :return: EnumerationResult
+    """
+    tasks = enumeration_tasks(cards)
+    done = np.zeros(len(tasks), dtype=bool)
+    categories = np.zeros(10, dtype=np.int64)
+    strengths = np.zeros(0, dtype=np.int32)
+    counts = np.zeros(0, dtype=np.int64)
+    if checkpoint is not None and os.path.exists(checkpoint):
+        with np.load(checkpoint) as saved:
+            if int(saved['cards']) != cards:
+                raise ValueError(f"{checkpoint} is a checkpoint of {int(saved['cards'])} card hands")
+            done, categories, strengths, counts = saved['done'], saved['categories'], saved['strengths'], saved['counts']
+
+    def save():
+        if checkpoint is not None:
+            temporary = checkpoint + '.tmp.npz'
+            np.savez(temporary, cards=cards, done=done, categories=categories, strengths=strengths, counts=counts)
+            os.replace(temporary, checkpoint)
+
+    total = comb(52, cards)
+    start_time = last_save = time.perf_counter()
+    start_hands = int(categories.sum())
+    todo = np.flatnonzero(~done)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    executor = ProcessPoolExecutor(workers) if workers > 1 else None
+    try:
+        if executor is None:
+            results = (_count_task(tasks[i], cards) for i in todo)
+        else:
+            results = executor.map(_count_task, [tasks[i] for i in todo], [cards] * len(todo), chunksize=8)
+        for index, (task_categories, task_strengths, task_counts) in zip(todo, results):
+            categories += task_categories
+            strengths, counts = _merge(strengths, counts, task_strengths, task_counts)
+            done[index] = True
+            now = time.perf_counter()
+            if now - last_save >= checkpoint_interval or done.all():
+                save()
+                last_save = now
+                if progress is not None:
+                    progress(int(categories.sum()), total, (int(categories.sum()) - start_hands) / (now - start_time))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return EnumerationResult(categories, strengths, counts, int(categories.sum()), time.perf_counter() - start_time)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--cards', type=int, default=7, help='number of cards in each hand')
+    parser.add_argument('--workers', type=int, default=None, help='number of processes')
+    parser.add_argument('--checkpoint', default='enumeration.checkpoint.npz', help='file the progress is saved to')
+    args = parser.parse_args()
+
+    def report(hands, total, rate):
+        print(f"{hands}/{total} hands ({100 * hands / total:.1f}%), {rate / 1e6:.2f}M hands/s", flush=True)
+
+    result = enumerate_hands(args.cards, args.workers, args.checkpoint, progress=report)
+    print(f"{result.hands} hands, {len(result.strengths)} different strengths, {result.seconds:.1f} s")
+    for handtype in sorted(HandValue, reverse=True):
+        print(f"{handtype.name:16} {result.categories[handtype]:10} {result.categories[handtype] / result.hands:.6f}")
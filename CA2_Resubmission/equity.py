@@ -0,0 +1,233 @@
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+import numpy as np
+from cardlib import (Hand, HandValue, VARIANTS, evaluate_batch, evaluate_variant, combination_indices, card_from_id,
+                     canonical_situation)
+
+EquityResult = namedtuple('EquityResult', ['win', 'tie', 'loss', 'equity', 'error', 'samples', 'outs'], defaults=((),))
+EquityResult.__doc__ = """ Outcome probabilities of one player. equity counts a tie between k players as 1/k of a win,
+    error is the half width of the confidence interval of equity (0 for exact results), samples is the number of
+    runouts and outs lists the next table cards that put a player who is not ahead in the lead (exact results only).
+    """
+
+
+def _known_ids(hands, table_cards):
+    """ Returns the hole card ids as a (players, cards) array and the table card ids, checking for repeated cards """
+    if len(hands) < 2:
+        raise ValueError("At least two hands are needed")
+    holes = np.array([[card.card_id for card in hand.cards] for hand in hands], dtype=np.uint8)
+    board = np.array([card.card_id for card in (table_cards or [])], dtype=np.uint8)
+    known = np.concatenate((holes.ravel(), board))
+    if len(np.unique(known)) != len(known):
+        raise ValueError("The same card is dealt more than once")
+    if len(board) > 5:
+        raise ValueError("There can't be more than five table cards")
+    return holes, board
+
+
+def _remaining_deck(holes, board):
+    dead = np.zeros(52, dtype=bool)
+    dead[holes.ravel()] = True
+    dead[board] = True
+    return np.flatnonzero(~dead).astype(np.uint8)
+
+
+def score_runouts(holes, board, runouts):
+    """ Evaluates every player on every runout of the remaining table cards.
+
+    :param holes: (players, cards) array of hole card ids
+    :param board: array of the table card ids that are already known
+    :param runouts: (N, m) array with the ids of the remaining table cards of each runout
+    :return: (players, N) arrays with wins, ties and the share of the pot won
+    """
+    n = len(runouts)
+    table = np.concatenate((np.broadcast_to(board, (n, len(board))), runouts), axis=1)
+    strengths = np.stack([evaluate_batch(np.concatenate((np.broadcast_to(hole, (n, len(hole))), table), axis=1))[0]
+                          for hole in holes])
+    best = strengths == strengths.max(axis=0)
+    winners = best.sum(axis=0)
+    wins = best & (winners == 1)
+    ties = best & (winners > 1)
+    share = best / winners
+    return wins, ties, share
+
+
+def _sample_batch(holes, board, samples, seed_sequence):
+    """ Deals samples random runouts and returns the summed wins, ties, pot shares and squared pot shares """
+    rng = np.random.default_rng(seed_sequence)
+    deck = _remaining_deck(holes, board)
+    missing = 5 - len(board)
+    runouts = rng.permuted(np.broadcast_to(deck, (samples, len(deck))), axis=1)[:, :missing]
+    wins, ties, share = score_runouts(holes, board, runouts)
+    return wins.sum(axis=1), ties.sum(axis=1), share.sum(axis=1), (share ** 2).sum(axis=1)
+
+
+def _normal_quantile(confidence):
+    """ Returns z such that a standard normal variable lies within +-z with the given probability """
+    return NormalDist().inv_cdf(0.5 + confidence / 2)
+
+
+def monte_carlo_equity(hands, table_cards=None, samples=200000, target_error=None, time_budget=None,
+                       batch_size=20000, workers=None, seed=None, confidence=0.95):
+    """ Estimates the win, tie and loss probabilities of two or more hands by dealing random runouts.
+        Batches of runouts are dealt and evaluated in a process pool, each batch with its own seed spawned from
+        seed, so a run with a fixed seed and sample count gives the same result for any number of workers.
+        The run stops when samples runouts are done, when the confidence interval of every equity is within
+        target_error, or when time_budget seconds have passed, whichever comes first.
+
+    :param hands: the players' hands
+    :param table_cards: the table cards that are already dealt
+    :param samples: maximum number of runouts
+    :param target_error: stop once all confidence interval half widths are at most this
+    :param time_budget: stop after this many seconds
+    :param batch_size: number of runouts dealt and evaluated at once
+    :param workers: number of processes, None for all cpus and 1 to run in this process
+    :param seed: seed of the random number generator
+    :param confidence: confidence level of the intervals
+    :return: list with an EquityResult for each hand
+    """
+    holes, board = _known_ids(hands, table_cards)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    z = _normal_quantile(confidence)
+    start_time = time.perf_counter()
+    seeds = np.random.SeedSequence(seed)
+
+    totals = np.zeros((4, len(holes)))
+    done = 0
+    executor = ProcessPoolExecutor(workers) if workers > 1 else None
+    try:
+        while done < samples:
+            # One wave gives every worker one batch, the stopping rules are checked between waves
+            sizes = []
+            while len(sizes) < workers and done + sum(sizes) < samples:
+                sizes.append(min(batch_size, samples - done - sum(sizes)))
+            children = seeds.spawn(len(sizes))
+            if executor is None:
+                results = [_sample_batch(holes, board, size, child) for size, child in zip(sizes, children)]
+            else:
+                results = executor.map(_sample_batch, [holes] * len(sizes), [board] * len(sizes), sizes, children)
+            for result in results:
+                totals += result
+            done += sum(sizes)
+
+            error = _confidence_error(totals, done, z)
+            if target_error is not None and error.max() <= target_error:
+                break
+            if time_budget is not None and time.perf_counter() - start_time >= time_budget:
+                break
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    error = _confidence_error(totals, done, z)
+    wins, ties, share, _ = totals / done
+    return [EquityResult(float(w), float(t), float(1 - w - t), float(s), float(e), done)
+            for w, t, s, e in zip(wins, ties, share, error)]
+
+
+def _confidence_error(totals, done, z):
+    """ Returns the confidence interval half width of each player's equity from the summed shares """
+    mean = totals[2] / done
+    variance = np.maximum(totals[3] / done - mean ** 2, 0)
+    return z * np.sqrt(variance / done)
+
+
+def _outs(holes, board, deck):
+    """ Returns, for each player who is not alone in the lead now, the next table cards that put that player alone
+        in the lead
+    """
+    if len(board) == 0 or len(board) == 5:
+        return [() for _ in holes]
+    leading = score_runouts(holes, board, np.zeros((1, 0), dtype=np.uint8))[0][:, 0]
+    wins = score_runouts(holes, board, deck[:, None])[0]
+    return [() if lead else tuple(card_from_id(card_id) for card_id in deck[win])
+            for lead, win in zip(leading, wins)]
+
+
+def exact_equity(hands, table_cards=None):
+    """ Computes the exact win, tie and loss probabilities of two or more hands by evaluating every possible runout
+        of the remaining table cards at once. On the flop and the turn there are only a few hundred runouts, so this
+        is both faster and more precise than sampling. For the Poker model, call it with the players' hands and
+        the table cards, e.g. exact_equity([p.hand for p in poker.players], poker.table_cards.cards)
+
+    :param hands: the players' hands
+    :param table_cards: the table cards that are already dealt
+    :return: list with an EquityResult for each hand, including the outs for the next table card
+    """
+    holes, board = _known_ids(hands, table_cards)
+    deck = _remaining_deck(holes, board)
+    runouts = deck[combination_indices(len(deck), 5 - len(board))]
+    wins, ties, share = score_runouts(holes, board, runouts)
+    n = len(runouts)
+    return [EquityResult(w / n, t / n, 1 - (w + t) / n, s / n, 0.0, n, outs)
+            for w, t, s, outs in zip(wins.sum(axis=1).tolist(), ties.sum(axis=1).tolist(), share.sum(axis=1).tolist(),
+                                     _outs(holes, board, deck))]
+
+
+def cached_equity(hands, table_cards=None, cache=None, **options):
+    """ Returns the equity of the hands like exact_equity (with three or more table cards) or monte_carlo_equity,
+        but looks the result up in cache first. The situation is reduced to its suit-isomorphic representative,
+        so all situations that only differ by a relabeling of the suits share one cached result.
+
+    :param hands: the players' hands
+    :param table_cards: the table cards that are already dealt
+    :param cache: an EquityCache, None for the default cache file
+    :param options: passed on to monte_carlo_equity and part of the cache key
+    :return: list with an EquityResult for each hand
+    """
+    if cache is None:
+        from equity_cache import EquityCache
+        cache = EquityCache()
+    table_cards = list(table_cards or [])
+    _known_ids(hands, table_cards)
+    form, permutation = canonical_situation([hand.cards for hand in hands] + [table_cards])
+    exact = len(table_cards) >= 3
+    key = ('exact',) + form if exact else ('monte_carlo', tuple(sorted(options.items()))) + form
+
+    def compute():
+        canonical_hands = [Hand([card_from_id(card_id) for card_id in group]) for group in form[:-1]]
+        canonical_table = [card_from_id(card_id) for card_id in form[-1]]
+        if exact:
+            return exact_equity(canonical_hands, canonical_table)
+        return monte_carlo_equity(canonical_hands, canonical_table, **options)
+
+    inverse = [permutation.index(suit) for suit in range(4)]
+    return [result._replace(outs=tuple(card_from_id(card_id) for card_id in
+                                       sorted(card.card_id & ~3 | inverse[card.card_id & 3] for card in result.outs)))
+            for result in cache.get_or_compute(key, compute)]
+
+
+def cached_evaluation(hands, table_cards, variant='holdem', cache=None):
+    """ Returns the strength and HandValue of each hand with the table cards like evaluate_variant, but looks the
+        result up in cache first. Strengths don't depend on the suit labels, so the situation is reduced to its
+        suit-isomorphic representative as in cached_equity and the result is used as it is.
+
+    :param hands: the players' hands
+    :param table_cards: the table cards, three to five
+    :param variant: a Variant or the name of one in VARIANTS
+    :param cache: an EquityCache, None for the default cache file
+    :return: list with (strength, HandValue) for each hand
+    """
+    if cache is None:
+        from equity_cache import EquityCache
+        cache = EquityCache()
+    if isinstance(variant, str):
+        variant = VARIANTS[variant]
+    table_cards = list(table_cards)
+    known = [card.card_id for hand in hands for card in hand.cards] + [card.card_id for card in table_cards]
+    if len(set(known)) != len(known):
+        raise ValueError("The same card is dealt more than once")
+    form, _ = canonical_situation([hand.cards for hand in hands] + [table_cards])
+
+    def compute():
+        holes = np.array(form[:-1], dtype=np.uint8)
+        boards = np.broadcast_to(np.array(form[-1], dtype=np.uint8), (len(holes), len(form[-1])))
+        strengths, handtypes = evaluate_variant(holes, boards, variant)
+        return list(zip(strengths.tolist(), handtypes.tolist()))
+
+    return [(strength, HandValue(handtype))
+            for strength, handtype in cache.get_or_compute(('evaluation', variant.name) + form, compute)]
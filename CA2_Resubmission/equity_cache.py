@@ -0,0 +1,80 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_FILE = os.path.join(os.path.expanduser('~'), '.cache', 'cardlib', 'equity.sqlite')
+
+
+class EquityCache(object):
+    """ Persistent key-value cache stored in an SQLite file, so results survive between sessions and can be shared
+        by several processes. Keys are the canonical situations from cardlib.canonical_situation (or any other
+        tuple of ints) and values are any picklable result. When more than max_entries results are stored, the
+        least recently used ones are removed.
+
+    :param filename: the cache file, created if it doesn't exist
+    :param max_entries: maximum number of stored results
+    """
+
+    def __init__(self, filename=DEFAULT_CACHE_FILE, max_entries=100000):
+        directory = os.path.dirname(filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.filename = filename
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(filename, check_same_thread=False, timeout=30)
+        with self.connection:
+            self.connection.execute('CREATE TABLE IF NOT EXISTS results '
+                                    '(key TEXT PRIMARY KEY, value BLOB NOT NULL, used INTEGER NOT NULL)')
+            self.connection.execute('CREATE INDEX IF NOT EXISTS results_used ON results (used)')
+
+    @staticmethod
+    def _key(key):
+        return repr(key)
+
+    def get(self, key, default=None):
+        """ Returns the result stored for key, or default if there is none """
+        with self.lock:
+            row = self.connection.execute('SELECT value FROM results WHERE key = ?', (self._key(key),)).fetchone()
+            if row is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            with self.connection:
+                self.connection.execute('UPDATE results SET used = ? WHERE key = ?', (time.time_ns(), self._key(key)))
+        return pickle.loads(row[0])
+
+    def put(self, key, value):
+        """ Stores value for key and removes the least recently used results if the cache is full """
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self.lock, self.connection:
+            self.connection.execute('INSERT OR REPLACE INTO results (key, value, used) VALUES (?, ?, ?)',
+                                    (self._key(key), blob, time.time_ns()))
+            excess = self.connection.execute('SELECT COUNT(*) FROM results').fetchone()[0] - self.max_entries
+            if excess > 0:
+                self.connection.execute('DELETE FROM results WHERE key IN '
+                                        '(SELECT key FROM results ORDER BY used LIMIT ?)', (excess,))
+
+    def get_or_compute(self, key, compute):
+        """ Returns the result stored for key, computing and storing it with compute() if there is none """
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def __len__(self):
+        with self.lock:
+            return self.connection.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+
+    def clear(self):
+        with self.lock, self.connection:
+            self.connection.execute('DELETE FROM results')
+
+    def close(self):
+        self.connection.close()
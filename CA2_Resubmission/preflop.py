@@ -0,0 +1,163 @@
+"""Precomputed heads-up preflop equities for the 169 starting-hand classes.
+
+The tables are built once with ``python preflop.py`` and stored in preflop_equity.bin next to cardlib. The build
+runs in a process pool and checkpoints every finished row, so an interrupted build continues where it stopped.
+"""
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from cardlib import evaluate_batch
+
+TABLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'preflop_equity.bin')
+CLASSES = 169
+_SCALE = 65535  # Equities are stored as uint16 fractions of this
+_VALUE_NAMES = '23456789TJQKA'
+_tables = None
+
+
+def hand_class(cards):
+    """ Returns the starting-hand class (0-168) of two hole cards. Pairs are on the diagonal of a 13 x 13 grid,
+        suited hands above it and offsuit hands below it.
+
+    :param cards: the two hole cards
+    """
+    first, second = cards
+    high, low = sorted((first.card_id >> 2, second.card_id >> 2), reverse=True)
+    if (first.card_id & 3) == (second.card_id & 3):
+        return low * 13 + high
+    return high * 13 + low
+
+
+def class_name(index):
+    """ Returns the usual name of a starting-hand class, e.g. 'AKs', 'T9o' or '77' """
+    row, column = divmod(index, 13)
+    if row == column:
+        return _VALUE_NAMES[row] * 2
+    if row < column:
+        return _VALUE_NAMES[column] + _VALUE_NAMES[row] + 's'
+    return _VALUE_NAMES[row] + _VALUE_NAMES[column] + 'o'
+
+
+def class_combos(index):
+    """ Returns all hole card id pairs in a starting-hand class as a (combos, 2) array """
+    row, column = divmod(index, 13)
+    high, low = max(row, column), min(row, column)
+    if row == column:
+        suits = [(a, b) for a in range(4) for b in range(a + 1, 4)]
+    elif row < column:
+        suits = [(a, a) for a in range(4)]
+    else:
+        suits = [(a, b) for a in range(4) for b in range(4) if a != b]
+    return np.array([(4 * high + a, 4 * low + b) for a, b in suits], dtype=np.uint8)
+
+
+def _deal_boards(rng, known, n):
+    """ Deals n random five-card boards that avoid the known cards in each row """
+    keys = rng.random((n, 52))
+    np.put_along_axis(keys, known.astype(np.int64), 2.0, axis=1)
+    return np.argpartition(keys, 5, axis=1)[:, :5].astype(np.uint8)
+
+
+def _sample_equity(rng, hero, villain, n):
+    """ Estimates the equity of random combos from hero against random combos from villain, avoiding overlaps.
+        villain is None for a random opponent hand.
+    """
+    hero_cards = hero[rng.integers(len(hero), size=n)]
+    if villain is None:
+        keys = rng.random((n, 52))
+        np.put_along_axis(keys, hero_cards.astype(np.int64), 2.0, axis=1)
+        villain_cards = np.argpartition(keys, 2, axis=1)[:, :2].astype(np.uint8)
+    else:
+        villain_cards = villain[rng.integers(len(villain), size=n)]
+        # Deal again where the two hands share a card until no overlap is left
+        overlap = (hero_cards[:, :, None] == villain_cards[:, None, :]).any(axis=(1, 2))
+        while overlap.any():
+            villain_cards[overlap] = villain[rng.integers(len(villain), size=overlap.sum())]
+            overlap = (hero_cards[:, :, None] == villain_cards[:, None, :]).any(axis=(1, 2))
+    boards = _deal_boards(rng, np.concatenate((hero_cards, villain_cards), axis=1), n)
+    hero_strength = evaluate_batch(np.concatenate((hero_cards, boards), axis=1))[0]
+    villain_strength = evaluate_batch(np.concatenate((villain_cards, boards), axis=1))[0]
+    return ((hero_strength > villain_strength).sum() + 0.5 * (hero_strength == villain_strength).sum()) / n
+
+
+def _build_row(index, samples, seed_sequence):
+    """ Computes the equity of class index against every class from index on and against a random hand """
+    rng = np.random.default_rng(seed_sequence)
+    hero = class_combos(index)
+    row = np.full(CLASSES, np.nan)
+    for other in range(index, CLASSES):
+        row[other] = 0.5 if other == index else _sample_equity(rng, hero, class_combos(other), samples)
+    return index, row, _sample_equity(rng, hero, None, samples)
+
+
+def build_tables(samples=20000, workers=None, seed=171, output=TABLE_FILE, checkpoint=None):
+    """ Builds the 169 x 169 heads-up equity table and the 169 equities against a random hand and writes them to
+        output. Each row is computed in a worker process with its own seed and saved to the checkpoint file when
+        it is done, so running the build again with the same checkpoint only computes the missing rows.
+
+    :param samples: number of random deals for each pair of classes
+    :param workers: number of processes, None for all cpus
+    :param seed: seed of the random number generator
+    :param output: file the finished tables are written to
+    :param checkpoint: file with the finished rows, defaults to output + '.checkpoint.npz'
+    :return: the equity table and the equities against a random hand
+    """
+    if checkpoint is None:
+        checkpoint = output + '.checkpoint.npz'
+    if os.path.exists(checkpoint):
+        with np.load(checkpoint) as saved:
+            table, versus_random, done = saved['table'], saved['versus_random'], saved['done']
+    else:
+        table = np.full((CLASSES, CLASSES), np.nan)
+        versus_random = np.full(CLASSES, np.nan)
+        done = np.zeros(CLASSES, dtype=bool)
+
+    seeds = np.random.SeedSequence(seed).spawn(CLASSES)
+    todo = np.flatnonzero(~done)
+    with ProcessPoolExecutor(workers) as executor:
+        for index, row, random_equity in executor.map(_build_row, todo, [samples] * len(todo), [seeds[i] for i in todo]):
+            table[index, index:] = row[index:]
+            table[index:, index] = 1 - row[index:]
+            versus_random[index] = random_equity
+            done[index] = True
+            temporary = checkpoint + '.tmp.npz'
+            np.savez(temporary, table=table, versus_random=versus_random, done=done)
+            os.replace(temporary, checkpoint)
+
+    np.concatenate((np.round(table.ravel() * _SCALE), np.round(versus_random * _SCALE))).astype('<u2').tofile(output)
+    os.remove(checkpoint)
+    return table, versus_random
+
+
+def load_tables(filename=TABLE_FILE):
+    """ Returns the equity table and the equities against a random hand stored in filename """
+    data = np.fromfile(filename, dtype='<u2').astype(np.float64) / _SCALE
+    return data[:CLASSES * CLASSES].reshape(CLASSES, CLASSES), data[CLASSES * CLASSES:]
+
+
+def preflop_equity(hand, other=None):
+    """ Looks up the preflop equity of a hand against another hand, or against a random hand if other is None.
+        Hands are reduced to their starting-hand class first, so the result is the average over all suit
+        combinations of the two classes.
+
+    :param hand: Hand with two hole cards
+    :param other: Hand with two hole cards or None
+    :return: the equity, where a tie counts as half a win
+    """
+    global _tables
+    if _tables is None:
+        _tables = load_tables()
+    table, versus_random = _tables
+    if other is None:
+        return versus_random[hand_class(hand.cards)]
+    return table[hand_class(hand.cards), hand_class(other.cards)]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--samples', type=int, default=20000, help='random deals for each pair of classes')
+    parser.add_argument('--workers', type=int, default=None, help='number of processes')
+    parser.add_argument('--seed', type=int, default=171)
+    args = parser.parse_args()
+    build_tables(args.samples, args.workers, args.seed)
@@ -0,0 +1,48 @@
+import json
+import numpy as np
+from cardlib import *
+from benchmark import *
+
+
+def test_differential_check():
+    rng = np.random.default_rng(44)
+    for cards in (5, 6, 7):
+        card_ids = random_hands(1000, cards, rng)
+        ranks = reference_ranks(card_ids)
+        for name, evaluate in EVALUATORS.items():
+            assert differential_check(evaluate, card_ids, ranks)['mismatches'] == 0, name
+
+    # An evaluator that ignores kickers, or gets the order wrong, is caught
+    card_ids = random_hands(1000, 7, rng)
+    categories_only = differential_check(lambda ids: evaluate_batch(ids)[1], card_ids)
+    assert categories_only['mismatches'] > 0 and len(categories_only['examples']) == 5
+    reversed_order = differential_check(lambda ids: -evaluate_batch(ids)[0], card_ids)
+    assert reversed_order['mismatches'] == 1000
+
+
+def test_run_benchmarks():
+    results = run_benchmarks(hands=20, repeat=1)
+    json.dumps(results)
+    assert {(r['benchmark'], r['cards']) for r in results if r['category'] == 'straight_flush'} == \
+        {(name, cards) for name in ('evaluate_batch', 'evaluate_cards', 'PokerHand', 'best_poker_hand')
+         for cards in (5, 6, 7)}
+    assert all(r['hands_per_second'] > 0 for r in results)
+    assert evaluation_cache.enabled
+
+    checks = run_checks(samples=100, exhaustive=False)
+    assert len(checks) == 3 * len(EVALUATORS)
+    assert all(check['mismatches'] == 0 for check in checks)
+
+
+def test_import_time():
+    times = import_time('cardlib')
+    assert times['cardlib'] > 0
+    # NumPy is only imported when a NumPy feature is used
+    assert 'numpy' not in times
+    assert 'numpy' in import_time('equity')
+
+    times = import_time('pokermodel', GAME_DIR)
+    assert times['pokermodel'] > 0 and 'cardlib' in times
+    # The model runs headless without loading Qt or NumPy
+    assert not any(name.startswith('PyQt5') for name in times)
+    assert 'numpy' not in times
@@ -1,6 +1,15 @@
 from enum import Enum
+from collections import Counter
+import itertools
+import multiprocessing
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pytest
 from cardlib import *
+from cardlib import _build_rank_tables, _load_rank_lists, _TOP5
+from benchmark import reference_rank
 
 # This test assumes you call your suit class "Suit" and the suits "Hearts and "Spades"
 def test_cards():
@@ -40,6 +49,36 @@ def test_cards():
         jack = JackCard(8, Suit.Hearts)
 
 
+def test_card_interning():
+    import copy
+    import pickle
+
+    assert NumberedCard(5, Suit.Hearts) is NumberedCard(5, Suit.Hearts)
+    assert AceCard(Suit.Spades) is card_from_id(AceCard(Suit.Spades).card_id)
+    assert sorted(c.card_id for c in StandardDeck().deck) == list(range(52))
+    assert len({c.mask for c in CARDS}) == 52
+    assert CARDS[0].get_value() == 2 and CARDS[51].get_value() == 14
+    assert pickle.loads(pickle.dumps(QueenCard(Suit.Clubs))) is QueenCard(Suit.Clubs)
+    assert copy.deepcopy(KingCard(Suit.Hearts)) is KingCard(Suit.Hearts)
+    assert StandardDeck().deck[0] is StandardDeck().deck[0]
+
+    with pytest.raises(AttributeError):
+        NumberedCard(5, Suit.Hearts).value = 6
+    with pytest.raises(AttributeError):
+        NumberedCard(5, Suit.Hearts).color = 'red'
+
+    assert NumberedCard(value=2, suit=Suit.Hearts) is NumberedCard(2, Suit.Hearts)
+    assert JackCard(suit=Suit.Spades) is JackCard(Suit.Spades)
+    for value in (1, 11, 15):
+        with pytest.raises(ValueError):
+            NumberedCard(value, Suit.Hearts)
+    with pytest.raises(ValueError):
+        AceCard(4)
+    # Cards with the same value are equal whatever their suit, so they can't be hashed
+    with pytest.raises(TypeError):
+        hash(NumberedCard(2, Suit.Hearts))
+
+
 # This test assumes you call your shuffle method "shuffle" and the method to draw a card "draw"
 def test_deck():
     d = StandardDeck()
@@ -107,6 +146,65 @@ def test_hand():
     assert PokerHand.straight(comb_2) is not False
 
 
+def test_bitset_containers():
+    d = StandardDeck()
+    assert len(d) == 52 and d.mask == (1 << 52) - 1
+    top = d.deck[-1]
+    assert top in d
+    assert d.draw() is top
+    assert top not in d
+    dealt = d.deal(3)
+    assert dealt.dtype == np.uint8 and len(d.deck) == 48
+    assert not any(card_from_id(card_id) in d for card_id in dealt)
+    with pytest.raises(IndexError):
+        d.deal(49)
+
+    h = Hand([NumberedCard(9, Suit.Clubs), NumberedCard(3, Suit.Hearts)])
+    h.add_card(AceCard(Suit.Spades))
+    assert AceCard(Suit.Spades) in h and AceCard(Suit.Hearts) not in h
+    h.drop_cards([0])
+    assert isinstance(h.cards, CardView) and h.ids.dtype == np.uint8
+    assert [c.card_id for c in h.cards] == [NumberedCard(3, Suit.Hearts).card_id, AceCard(Suit.Spades).card_id]
+    h.remove_card(AceCard(Suit.Spades))
+    assert len(h) == 1 and AceCard(Suit.Spades) not in h
+
+    table = [KingCard(Suit.Hearts), NumberedCard(3, Suit.Clubs)]
+    union = h.union(table)
+    assert len(union) == 3 and union.mask == h.mask | table[0].mask | table[1].mask
+    assert h.best_poker_hand(table).handtype == HandValue.one_pair
+    assert h.best_poker_hand(Hand(table)).handtype == HandValue.one_pair
+    h.clear_hand()
+    assert h.cards == [] and h.mask == 0
+    assert h and StandardDeck()
+
+
+def test_card_views():
+    h = Hand([NumberedCard(4, Suit.Clubs)])
+    cards = h.cards
+    h.add_card(QueenCard(Suit.Hearts))
+    # The view follows the hand, but can't be changed itself
+    assert len(cards) == 2 and cards[-1] is QueenCard(Suit.Hearts) and cards[:1] == [NumberedCard(4, Suit.Clubs)]
+    with pytest.raises(AttributeError):
+        h.cards.append(AceCard(Suit.Spades))
+    with pytest.raises(TypeError):
+        h.cards[0] = AceCard(Suit.Spades)
+    assert len(h) == 2
+    copied = h.cards.copy()
+    copied.append(AceCard(Suit.Spades))
+    assert len(copied) == 3 and len(h) == 2
+    assert h.cards + [AceCard(Suit.Spades)] == copied
+
+    d = StandardDeck()
+    with pytest.raises(AttributeError):
+        d.deck.pop()
+    assert len(d) == 52
+    d.draw()
+    assert len(d.deck) == 51 and list(d.deck) == d.deck[:]
+
+    empty = Hand()
+    assert empty and not empty.cards and len(empty) == 0
+
+
 # This test builds on the assumptions above. Add your type and data for the commented out tests
 # and uncomment them!
 def test_pokerhands():
@@ -167,6 +265,59 @@ def test_pokerhands():
     assert ph5.handtype != HandValue.straight_flush
 
 
+def test_evaluate_cards():
+    royal = [AceCard(Suit.Spades), KingCard(Suit.Spades), QueenCard(Suit.Spades), JackCard(Suit.Spades),
+             NumberedCard(10, Suit.Spades), NumberedCard(2, Suit.Hearts), NumberedCard(3, Suit.Clubs)]
+    wheel = [AceCard(Suit.Hearts), NumberedCard(2, Suit.Spades), NumberedCard(3, Suit.Clubs),
+             NumberedCard(4, Suit.Diamonds), NumberedCard(5, Suit.Hearts), KingCard(Suit.Clubs)]
+    trips_over_pair = [NumberedCard(7, Suit.Hearts), NumberedCard(7, Suit.Spades), NumberedCard(7, Suit.Clubs),
+                       NumberedCard(9, Suit.Hearts), NumberedCard(9, Suit.Spades), NumberedCard(9, Suit.Clubs)]
+
+    assert strength_handtype(evaluate_cards(royal)) == HandValue.straight_flush
+    assert evaluate_cards(wheel) == HandValue.straight << 20 | 5 << 16
+    assert evaluate_cards(trips_over_pair) == HandValue.full_house << 20 | 9 << 16 | 7 << 12
+    assert evaluate_cards(royal) > evaluate_cards(trips_over_pair) > evaluate_cards(wheel)
+    assert PokerHand(wheel).handtype == HandValue.straight
+    assert PokerHand(wheel).strength == evaluate_cards(wheel)
+
+
+def test_strength_total_order():
+    # Every 5-card hand ranks like one of these: each multiset of values, with and without a flush
+    hands = []
+    for values in itertools.combinations_with_replacement(range(2, 15), 5):
+        if max(Counter(values).values()) == 5:
+            continue
+        hands.append([CARDS[4 * (v - 2) + i % 4] for i, v in enumerate(values)])
+        if len(set(values)) == 5:
+            hands.append([CARDS[4 * (v - 2)] for v in values])
+    ranked = sorted((reference_rank(hand), PokerHand(hand)) for hand in hands)
+    for (ref_1, ph_1), (ref_2, ph_2) in zip(ranked[:-1], ranked[1:]):
+        if ref_1 == ref_2:
+            assert ph_1 == ph_2
+        else:
+            assert ph_1 < ph_2
+        assert ph_1.handtype == ref_1[0]
+
+    rng = random.Random(171)
+    for _ in range(500):
+        cards = rng.sample(CARDS, 7)
+        best = max(itertools.combinations(cards, 5), key=reference_rank)
+        assert PokerHand(cards) == PokerHand(list(best))
+        assert PokerHand(cards).handtype == reference_rank(best)[0]
+
+
+def test_evaluate_batch():
+    rng = np.random.default_rng(35)
+    ids = np.argsort(rng.random((3000, 52)), axis=1)[:, :7].astype(np.uint8)
+    strengths, handtypes = evaluate_batch(ids, chunk_size=1000)
+    assert strengths.shape == handtypes.shape == (3000,)
+    for row, strength, handtype in zip(ids, strengths, handtypes):
+        ph = PokerHand([card_from_id(i) for i in row])
+        assert ph.strength == strength
+        assert ph.handtype == handtype
+    assert np.array_equal(card_ids(CARDS), np.arange(52))
+
+
 empty_hand = Hand()
 
 highcard = [NumberedCard(10, Suit.Diamonds), NumberedCard(9, Suit.Diamonds),
@@ -256,3 +407,156 @@ test3 = [QueenCard(Suit.Hearts), AceCard(Suit.Hearts), QueenCard(Suit.Spades), N
 assert empty_hand.best_poker_hand(test3).handtype == HandValue.two_pair
 
 
+
+
+def test_bulk_dealing():
+    decks = shuffled_decks(1000, rng=41)
+    assert decks.shape == (1000, 52) and decks.dtype == np.uint8
+    assert (np.sort(decks, axis=1) == np.arange(52)).all()
+    assert (decks == shuffled_decks(1000, rng=41)).all()
+    assert not (decks == shuffled_decks(1000, rng=42)).all()
+    # Every card shows up roughly equally often in the first position
+    assert np.bincount(decks[:, 0], minlength=52).max() < 50
+
+    deals = deal_rounds(decks, 3)
+    assert deals.holes.shape == (1000, 3, 2) and deals.flop.shape == (1000, 3)
+    assert (deals.holes[:, 1] == decks[:, 2:4]).all()
+    assert (deals.river == decks[:, 10]).all()
+
+    # A deck made from a row deals the same cards
+    deck = StandardDeck.from_order(decks[0])
+    assert len(deck) == 52
+    dealt = [deck.draw().card_id for _ in range(11)]
+    assert dealt == deals.holes[0].ravel().tolist() + deals.flop[0].tolist() + [deals.turn[0], deals.river[0]]
+
+    first, second = spawn_generators(7, 2)
+    assert not (shuffled_decks(10, first) == shuffled_decks(10, second)).all()
+
+
+def test_evaluation_cache():
+    cache = EvaluationCache(maxsize=2)
+    cards = [AceCard(Suit.Spades), KingCard(Suit.Spades), QueenCard(Suit.Spades), JackCard(Suit.Spades),
+             NumberedCard(10, Suit.Spades), NumberedCard(2, Suit.Hearts), NumberedCard(3, Suit.Clubs)]
+    assert cache.strength(cards) == evaluate_cards(cards)
+    assert cache.strength(cards[::-1]) == evaluate_cards(cards)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # The least recently used card set is dropped first
+    cache.strength(cards[:5])
+    cache.strength(cards)
+    cache.strength(cards[2:])
+    assert len(cache) == 2
+    cache.strength(cards[:5])
+    assert (cache.hits, cache.misses) == (2, 4)
+
+    # Repeated cards are not stored, since the mask can't tell how many copies there are
+    # and they never get the strength stored for the same cards without the copy
+    doubled = cards[:4] + [AceCard(Suit.Spades)]
+    assert cache.strength(doubled) == evaluate_cards(doubled)
+    assert cache.strength(cards[:4]) == evaluate_cards(cards[:4])
+    assert cache.strength(doubled) == evaluate_cards(doubled)
+    evaluation_cache.clear()
+    PokerHand(cards[:4])
+    assert PokerHand(doubled).handtype == HandValue.flush
+
+    cache.resize(0)
+    assert not cache.enabled and len(cache) == 0
+    hits = cache.hits
+    cache.strength(cards)
+    assert cache.hits == hits
+
+
+def test_hand_state():
+    random.seed(43)
+    for _ in range(500):
+        deck = StandardDeck()
+        deck.shuffle()
+        cards = [deck.draw() for _ in range(7)]
+        state = HandState(cards[:2])
+        for n in range(3, 8):
+            state.add_card(cards[n - 1])
+            assert state.strength == evaluate_cards(cards[:n])
+        assert state.handtype == PokerHand(cards).handtype
+
+    # Copies are independent, and states compare like poker hands
+    pair = HandState([AceCard(Suit.Spades), AceCard(Suit.Hearts)])
+    trips = pair.copy()
+    trips.add_card(AceCard(Suit.Clubs))
+    assert pair.handtype == HandValue.one_pair and trips.handtype == HandValue.three_of_a_kind
+    assert pair < trips
+    assert HandState().handtype is None
+
+
+def _table_file_in_worker():
+    return rank_tables()[2].filename
+
+
+def test_rank_table_file(tmp_path, monkeypatch):
+    filename = str(tmp_path / 'tables.npy')
+    tables = load_rank_tables(filename)
+    for table, built in zip(tables, _build_rank_tables()):
+        assert (table == built).all()
+        assert not table.flags.writeable
+
+    # Once the file is there it is only mapped, and a broken file is built again
+    monkeypatch.setattr('cardlib._build_rank_tables', lambda: pytest.fail("tables built again"))
+    assert (load_rank_tables(filename)[2] == rank_tables()[2]).all()
+    monkeypatch.undo()
+    with open(filename, 'wb') as file:
+        file.write(b'broken')
+    assert (load_rank_tables(filename)[3] == rank_tables()[3]).all()
+    assert (load_rank_tables(str(tmp_path / 'missing' / 'tables.npy'))[0] == rank_tables()[0]).all()
+
+    # Worker processes map the same file
+    with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('spawn')) as executor:
+        assert executor.submit(_table_file_in_worker).result() == os.path.abspath(RANK_TABLE_FILE)
+
+
+def test_variants():
+    rng = np.random.default_rng(48)
+    decks = shuffled_decks(3000, rng)
+    holes, boards = decks[:, :4], decks[:, 4:9]
+    strengths, handtypes, best = evaluate_variant(holes, boards, 'omaha', return_best=True)
+    table = combination_table(4, 5, 2)
+    assert table.shape == (60, 5) and ((table < 4).sum(axis=1) == 2).all()
+    # Same as evaluating every legal combination on its own
+    rows = np.concatenate((holes, boards), axis=1)[:, table]
+    every = evaluate_batch(rows.reshape(-1, 5))[0].reshape(len(holes), 60)
+    assert (every.max(axis=1) == strengths).all()
+    assert (every[np.arange(len(holes)), best] == strengths).all()
+    assert (handtypes == strengths >> 20).all()
+    assert (evaluate_variant(decks[:, :2], decks[:, 2:7])[0] == evaluate_batch(decks[:, :7])[0]).all()
+
+    # Four hearts in the hand and one on the board is no flush in Omaha
+    hand = Hand([AceCard(Suit.Hearts), KingCard(Suit.Hearts), QueenCard(Suit.Hearts), JackCard(Suit.Hearts)])
+    board = [NumberedCard(9, Suit.Hearts), NumberedCard(4, Suit.Spades), NumberedCard(5, Suit.Clubs),
+             NumberedCard(6, Suit.Diamonds), NumberedCard(7, Suit.Spades)]
+    assert hand.best_poker_hand(board).handtype == HandValue.flush
+    omaha = hand.best_poker_hand(board, 'omaha')
+    assert omaha.handtype == HandValue.high_card and len(omaha.cards) == 5
+
+    # Short-deck: a flush beats a full house and A-6-7-8-9 is the lowest straight
+    short = VARIANTS['shortdeck']
+    assert len(variant_deck(short)) == 36
+    full_house = Hand([KingCard(Suit.Hearts), KingCard(Suit.Spades)])
+    flush = Hand([NumberedCard(8, Suit.Hearts), NumberedCard(6, Suit.Hearts)])
+    board = [KingCard(Suit.Clubs), NumberedCard(7, Suit.Hearts), NumberedCard(7, Suit.Clubs),
+             NumberedCard(10, Suit.Hearts), JackCard(Suit.Hearts)]
+    assert full_house.best_poker_hand(board) > flush.best_poker_hand(board)
+    assert full_house.best_poker_hand(board, short) < flush.best_poker_hand(board, short)
+    assert flush.best_poker_hand(board, short).handtype == HandValue.flush
+
+    wheel = Hand([AceCard(Suit.Spades), NumberedCard(6, Suit.Hearts)])
+    six_high = Hand([NumberedCard(10, Suit.Spades), NumberedCard(6, Suit.Clubs)])
+    board = [NumberedCard(7, Suit.Clubs), NumberedCard(8, Suit.Diamonds), NumberedCard(9, Suit.Hearts),
+             QueenCard(Suit.Spades), KingCard(Suit.Diamonds)]
+    assert wheel.best_poker_hand(board, short).handtype == HandValue.straight
+    assert wheel.best_poker_hand(board).handtype == HandValue.high_card
+    assert wheel.best_poker_hand(board, short) < six_high.best_poker_hand(board, short)
+
+
+def test_rank_lists(tmp_path):
+    filename = str(tmp_path / 'tables.npy')
+    assert _load_rank_lists(filename) == [table.tolist() for table in _build_rank_tables()]
+    # Read from the file that was just built
+    assert _load_rank_lists(filename)[2] == _TOP5
@@ -0,0 +1,40 @@
+import pytest
+from cardlib import *
+from enumeration import *
+
+FIVE_CARD_COUNTS = {HandValue.straight_flush: 40, HandValue.four_of_a_kind: 624, HandValue.full_house: 3744,
+                    HandValue.flush: 5108, HandValue.straight: 10200, HandValue.three_of_a_kind: 54912,
+                    HandValue.two_pair: 123552, HandValue.one_pair: 1098240, HandValue.high_card: 1302540}
+
+
+def test_enumerate_hands():
+    result = enumerate_hands(5, workers=1)
+    assert result.hands == 2598960 == result.counts.sum()
+    assert {handtype: result.categories[handtype] for handtype in HandValue} == FIVE_CARD_COUNTS
+    # Every 5-card hand ranks like one of the 7462 classes
+    assert len(result.strengths) == 7462
+    assert (result.strengths[1:] > result.strengths[:-1]).all()
+
+    # Every 7-card hand is in exactly one task
+    tasks = enumeration_tasks(7)
+    assert len(set(tasks)) == len(tasks)
+    assert sum(len(combination_indices(51 - task[-1], 4)) for task in tasks) == 133784560
+
+
+def test_checkpoint(tmp_path):
+    checkpoint = str(tmp_path / 'enumeration.npz')
+
+    class Stop(Exception):
+        pass
+
+    def stop(hands, total, rate):
+        assert 0 < hands < total and rate > 0
+        raise Stop
+
+    with pytest.raises(Stop):
+        enumerate_hands(5, workers=1, checkpoint=checkpoint, checkpoint_interval=0, progress=stop)
+    resumed = enumerate_hands(5, workers=1, checkpoint=checkpoint)
+    assert resumed.hands == 2598960
+    assert {handtype: resumed.categories[handtype] for handtype in HandValue} == FIVE_CARD_COUNTS
+    with pytest.raises(ValueError):
+        enumerate_hands(6, workers=1, checkpoint=checkpoint)
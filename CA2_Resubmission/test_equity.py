@@ -0,0 +1,122 @@
+import pytest
+from cardlib import *
+from equity import *
+from equity_cache import EquityCache
+
+
+def test_monte_carlo_equity():
+    aces = Hand([AceCard(Suit.Spades), AceCard(Suit.Hearts)])
+    kings = Hand([KingCard(Suit.Spades), KingCard(Suit.Hearts)])
+
+    result = monte_carlo_equity([aces, kings], samples=40000, workers=1, seed=171)
+    assert len(result) == 2
+    assert result[0].samples == 40000
+    assert abs(result[0].equity - 0.82) < 0.02
+    assert abs(result[0].equity + result[1].equity - 1) < 1e-9
+    assert abs(result[0].win + result[0].tie + result[0].loss - 1) < 1e-9
+    assert result[0].win == result[1].loss
+    assert 0 < result[0].error < 0.01
+
+    assert result == monte_carlo_equity([aces, kings], samples=40000, workers=1, seed=171)
+
+    early = monte_carlo_equity([aces, kings], samples=10 ** 7, target_error=0.01, batch_size=5000, workers=1)
+    assert early[0].samples < 10 ** 7
+    assert early[0].error <= 0.01
+
+    # The river is dealt, so the result is known
+    board = [AceCard(Suit.Clubs), NumberedCard(7, Suit.Hearts), NumberedCard(2, Suit.Clubs),
+             NumberedCard(9, Suit.Diamonds), JackCard(Suit.Spades)]
+    river = monte_carlo_equity([aces, kings], board, samples=100, workers=1)
+    assert river[0].win == 1 and river[1].loss == 1
+
+    with pytest.raises(ValueError):
+        monte_carlo_equity([aces, aces])
+
+
+def test_exact_equity():
+    aces = Hand([AceCard(Suit.Spades), AceCard(Suit.Hearts)])
+    kings = Hand([KingCard(Suit.Spades), KingCard(Suit.Hearts)])
+    flop = [KingCard(Suit.Clubs), NumberedCard(7, Suit.Hearts), NumberedCard(2, Suit.Hearts)]
+
+    result = exact_equity([aces, kings], flop)
+    assert result[0].samples == 990
+    assert result[0].error == 0
+    # Aces need one of the two remaining aces, or runner-runner hearts without pairing the board for kings
+    assert [card.card_id for card in result[0].outs] == [AceCard(Suit.Clubs).card_id, AceCard(Suit.Diamonds).card_id]
+    assert result[1].outs == ()
+    assert abs(result[0].equity + result[1].equity - 1) < 1e-12
+
+    sampled = monte_carlo_equity([aces, kings], flop, samples=40000, workers=1, seed=37)
+    assert abs(sampled[0].equity - result[0].equity) < 3 * sampled[0].error + 1e-3
+
+    turn = exact_equity([aces, kings], flop + [NumberedCard(9, Suit.Spades)])
+    assert turn[0].samples == 44
+    assert turn[0].win == 2 / 44
+
+
+def test_cached_equity(tmp_path):
+    cache = EquityCache(str(tmp_path / 'cache.sqlite'), max_entries=2)
+    aces = Hand([AceCard(Suit.Spades), AceCard(Suit.Hearts)])
+    kings = Hand([KingCard(Suit.Spades), KingCard(Suit.Hearts)])
+    flop = [KingCard(Suit.Clubs), NumberedCard(7, Suit.Hearts), NumberedCard(2, Suit.Hearts)]
+
+    # The same situation with hearts and diamonds swapped
+    def swap(card):
+        suit = {int(Suit.Hearts): Suit.Diamonds, int(Suit.Diamonds): Suit.Hearts}.get(int(card.suit), card.suit)
+        return card_from_id(card.card_id & ~3 | suit)
+    swapped = [Hand([swap(card) for card in hand.cards]) for hand in (aces, kings)]
+    swapped_flop = [swap(card) for card in flop]
+
+    assert canonical_situation([aces.cards, kings.cards, flop])[0] == \
+        canonical_situation([swapped[0].cards, swapped[1].cards, swapped_flop])[0]
+
+    result = cached_equity([aces, kings], flop, cache=cache)
+    assert (cache.hits, cache.misses) == (0, 1)
+    swapped_result = cached_equity(swapped, swapped_flop, cache=cache)
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert swapped_result == exact_equity(swapped, swapped_flop)
+    assert [card.card_id for card in swapped_result[0].outs] == \
+        [card.card_id for card in exact_equity(swapped, swapped_flop)[0].outs]
+    assert result[0].equity == swapped_result[0].equity
+
+    # The results are still there after reopening, and only the two most recently used are kept
+    cache.close()
+    cache = EquityCache(str(tmp_path / 'cache.sqlite'), max_entries=2)
+    cached_equity([aces, kings], flop, cache=cache)
+    assert cache.hits == 1
+    for value in (3, 4, 5):
+        cached_equity([aces, kings], [NumberedCard(value, Suit.Clubs)] + flop[1:], cache=cache)
+    assert len(cache) == 2
+
+
+def test_cached_evaluation(tmp_path):
+    cache = EquityCache(str(tmp_path / 'cache.sqlite'))
+    hands = [Hand([AceCard(Suit.Spades), AceCard(Suit.Hearts)]),
+             Hand([KingCard(Suit.Hearts), QueenCard(Suit.Hearts)])]
+    board = [JackCard(Suit.Hearts), NumberedCard(10, Suit.Hearts), NumberedCard(2, Suit.Clubs),
+             AceCard(Suit.Clubs)]
+    result = cached_evaluation(hands, board, cache=cache)
+    assert [handtype for _, handtype in result] == [HandValue.three_of_a_kind, HandValue.straight]
+    assert [strength for strength, _ in result] == [hand.best_poker_hand(board).strength for hand in hands]
+    assert (cache.hits, cache.misses) == (0, 1)
+
+    # Spades and clubs swapped is the same situation
+    def swap(card):
+        suit = {int(Suit.Spades): Suit.Clubs, int(Suit.Clubs): Suit.Spades}.get(int(card.suit), card.suit)
+        return card_from_id(card.card_id & ~3 | suit)
+    swapped = cached_evaluation([Hand([swap(card) for card in hand.cards]) for hand in hands],
+                                [swap(card) for card in board], cache=cache)
+    assert swapped == result and (cache.hits, cache.misses) == (1, 1)
+
+    # Each variant has its own results, and they are still there after reopening
+    omaha = [Hand(hands[0].cards + [NumberedCard(3, Suit.Diamonds), NumberedCard(5, Suit.Diamonds)]),
+             Hand(hands[1].cards + [NumberedCard(4, Suit.Diamonds), NumberedCard(6, Suit.Diamonds)])]
+    strengths, handtypes = evaluate_variant([hand.ids for hand in omaha], [card_ids(board)] * 2, 'omaha')
+    assert cached_evaluation(omaha, board, 'omaha', cache=cache) == list(zip(strengths.tolist(),
+                                                                              map(HandValue, handtypes.tolist())))
+    cache.close()
+    cache = EquityCache(str(tmp_path / 'cache.sqlite'))
+    assert cached_evaluation(hands, board, cache=cache) == result and cache.hits == 1
+
+    with pytest.raises(ValueError):
+        cached_evaluation(hands, board + [AceCard(Suit.Spades)], cache=cache)
@@ -0,0 +1,35 @@
+import numpy as np
+from cardlib import *
+from preflop import *
+
+
+def test_hand_classes():
+    assert class_name(hand_class([AceCard(Suit.Spades), KingCard(Suit.Spades)])) == 'AKs'
+    assert class_name(hand_class([KingCard(Suit.Hearts), AceCard(Suit.Spades)])) == 'AKo'
+    assert class_name(hand_class([NumberedCard(7, Suit.Clubs), NumberedCard(7, Suit.Hearts)])) == '77'
+    assert len({class_name(i) for i in range(CLASSES)}) == CLASSES
+    assert sum(len(class_combos(i)) for i in range(CLASSES)) == 1326
+    for i in range(CLASSES):
+        for first, second in class_combos(i):
+            assert hand_class([card_from_id(first), card_from_id(second)]) == i
+
+
+def test_build_tables(tmp_path):
+    output = str(tmp_path / 'equity.bin')
+    table, versus_random = build_tables(samples=20, workers=1, output=output)
+    loaded_table, loaded_random = load_tables(output)
+    assert loaded_table.shape == (CLASSES, CLASSES)
+    assert np.allclose(loaded_table, table, atol=1e-4)
+    assert np.allclose(loaded_random, versus_random, atol=1e-4)
+    assert np.allclose(table + table.T, 1)
+    assert np.all(np.diag(table) == 0.5)
+
+
+def test_preflop_equity():
+    aces = Hand([AceCard(Suit.Spades), AceCard(Suit.Hearts)])
+    kings = Hand([KingCard(Suit.Spades), KingCard(Suit.Hearts)])
+    seven_two = Hand([NumberedCard(7, Suit.Spades), NumberedCard(2, Suit.Hearts)])
+    assert abs(preflop_equity(aces, kings) - 0.82) < 0.02
+    assert abs(preflop_equity(aces) - 0.85) < 0.02
+    assert abs(preflop_equity(aces, kings) + preflop_equity(kings, aces) - 1) < 1e-4
+    assert preflop_equity(seven_two) < 0.4
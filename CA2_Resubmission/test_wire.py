@@ -0,0 +1,62 @@
+import pickle
+import pytest
+from cardlib import *
+from wire import *
+
+
+def test_cards_and_hands():
+    cards = [AceCard(Suit.Spades), NumberedCard(2, Suit.Hearts), KingCard(Suit.Diamonds)]
+    assert encode_cards(cards) == bytes([49, 0, 47])
+    assert [c.card_id for c in decode_cards(encode_cards(cards))] == [49, 0, 47]
+
+    hand = Hand(cards)
+    record = encode_hand(hand)
+    assert len(record) == HAND_SIZE
+    assert decode_hand(record).ids.tolist() == hand.ids.tolist()
+    assert len(record) < len(pickle.dumps(hand))
+    with pytest.raises(ValueError):
+        encode_hand(Hand(list(CARDS[:9])))
+
+    board = encode_board(cards)
+    assert len(board) == BOARD_SIZE and board[3:] == bytes([EMPTY, EMPTY])
+    assert decode_board(board) == cards
+
+
+def test_records():
+    deck = StandardDeck()
+    deck.shuffle()
+    hands = [Hand([deck.draw() for _ in range(2)]) for _ in range(3)]
+    table_cards = [deck.draw() for _ in range(4)]
+
+    buffer = bytearray(b''.join(encode_hand(hand) for hand in hands))
+    records = hand_records(buffer)
+    assert records.shape == (3, HAND_SIZE)
+    assert records[1, :2].tolist() == hands[1].ids.tolist()
+    # The records are a view of the buffer, not a copy
+    buffer[HAND_SIZE] = 7
+    assert records[1, 0] == 7
+
+    poker_hands = [hand.best_poker_hand(table_cards) for hand in hands]
+    data = b''.join(encode_poker_hand(ph) for ph in poker_hands)
+    assert len(data) == 3 * POKER_HAND_DTYPE.itemsize == 36
+    stored = poker_hand_records(data)
+    assert stored['strength'].tolist() == [ph.strength for ph in poker_hands]
+    for ph, record in zip(poker_hands, stored):
+        decoded = decode_poker_hand(record.tobytes())
+        assert decoded == ph and decoded.handtype == ph.handtype
+        assert [c.card_id for c in decoded.cards] == [c.card_id for c in ph.cards]
+
+    # Short-deck ranks flushes above full houses, the stored strength and type are kept as they are
+    hole = Hand([NumberedCard(6, Suit.Hearts), NumberedCard(6, Suit.Spades)])
+    board = [NumberedCard(6, Suit.Clubs), NumberedCard(9, Suit.Hearts), NumberedCard(9, Suit.Spades),
+             KingCard(Suit.Diamonds), AceCard(Suit.Clubs)]
+    short_deck = hole.best_poker_hand(board, 'shortdeck')
+    decoded = decode_poker_hand(encode_poker_hand(short_deck))
+    assert decoded.handtype == short_deck.handtype == HandValue.full_house
+    assert decoded.strength == short_deck.strength != hole.best_poker_hand(board).strength
+    assert decoded == short_deck
+
+    rounds = round_records(encode_round(hands, table_cards) * 2, players=3)
+    assert len(rounds) == 2
+    assert rounds['holes'][0].tolist() == [hand.ids.tolist() for hand in hands]
+    assert rounds['board'][1, :4].tolist() == [c.card_id for c in table_cards] and rounds['board'][1, 4] == EMPTY
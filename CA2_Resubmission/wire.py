@@ -0,0 +1,98 @@
+"""Compact binary format for cards, hands, poker hands and rounds.
+
+Every card is one byte, its card id (0-51), and unused card slots hold EMPTY. Hands, boards, poker hands and rounds
+are fixed-size records, so a buffer of records can be read as a NumPy array without copying (see hand_records,
+poker_hand_records and round_records) and sent between processes or written to disk as it is.
+"""
+import numpy as np
+from cardlib import CARDS, HandValue, Hand, PokerHand
+
+EMPTY = 0xFF  #: Byte of an unused card slot
+HAND_SIZE = 8  #: Card slots in a hand record
+BOARD_SIZE = 5  #: Card slots in a board record
+POKER_HAND_SIZE = 7  #: Card slots in a poker hand record, enough for two hole cards and five table cards
+POKER_HAND_DTYPE = np.dtype([('cards', 'u1', POKER_HAND_SIZE), ('handtype', 'u1'),
+                             ('strength', '<u4')])  #: 12 bytes, no padding
+
+
+def round_dtype(players):
+    """ Returns the record type of a round with the given number of players: two hole cards for each player followed
+        by the board
+    """
+    return np.dtype([('holes', 'u1', (players, 2)), ('board', 'u1', BOARD_SIZE)])
+
+
+def encode_cards(cards, size=None):
+    """ Encodes cards as one byte each.
+
+    :param cards: the cards
+    :param size: length of the record, the cards are padded with EMPTY; None for exactly one byte per card
+    :return: bytes
+    """
+    ids = bytes(card.card_id for card in cards)
+    if size is None:
+        return ids
+    if len(ids) > size:
+        raise ValueError(f"{len(ids)} cards don't fit in a record of {size}")
+    return ids + bytes([EMPTY]) * (size - len(ids))
+
+
+def decode_cards(data):
+    """ Returns the cards in a bytes-like object, skipping EMPTY slots """
+    return [CARDS[card_id] for card_id in bytes(data) if card_id != EMPTY]
+
+
+def encode_hand(hand):
+    """ Encodes a Hand, in its card order, as a HAND_SIZE byte record """
+    return encode_cards(hand.cards, HAND_SIZE)
+
+
+def decode_hand(data):
+    return Hand(decode_cards(data))
+
+
+def encode_board(table_cards):
+    """ Encodes up to five table cards as a BOARD_SIZE byte record """
+    return encode_cards(table_cards, BOARD_SIZE)
+
+
+def decode_board(data):
+    return decode_cards(data)
+
+
+def encode_poker_hand(poker_hand):
+    """ Encodes a PokerHand as a POKER_HAND_DTYPE record: its cards, its HandValue and its strength, so stored hands
+        can be compared without evaluating them again. The hand type is stored as well since it can't be told from
+        the strength of a variant like short-deck.
+    """
+    return (encode_cards(poker_hand.cards, POKER_HAND_SIZE) + bytes([int(poker_hand.handtype)]) +
+            int(poker_hand.strength).to_bytes(4, 'little'))
+
+
+def decode_poker_hand(data):
+    """ Returns the PokerHand of a POKER_HAND_DTYPE record with the stored hand type and strength """
+    data = bytes(data)
+    poker_hand = PokerHand(decode_cards(data[:POKER_HAND_SIZE]))
+    poker_hand.handtype = HandValue(data[POKER_HAND_SIZE])
+    poker_hand.strength = int.from_bytes(data[POKER_HAND_SIZE + 1:POKER_HAND_SIZE + 5], 'little')
+    return poker_hand
+
+
+def encode_round(hands, table_cards):
+    """ Encodes the hole cards of every player and the table cards as one round_dtype(len(hands)) record """
+    return b''.join(encode_cards(hand.cards, 2) for hand in hands) + encode_board(table_cards)
+
+
+def hand_records(data):
+    """ Views a buffer of hand records as an (N, HAND_SIZE) uint8 array without copying """
+    return np.frombuffer(data, dtype=np.uint8).reshape(-1, HAND_SIZE)
+
+
+def poker_hand_records(data):
+    """ Views a buffer of poker hand records as a POKER_HAND_DTYPE array without copying """
+    return np.frombuffer(data, dtype=POKER_HAND_DTYPE)
+
+
+def round_records(data, players):
+    """ Views a buffer of round records as a round_dtype(players) array without copying """
+    return np.frombuffer(data, dtype=round_dtype(players))
@@ -0,0 +1,150 @@
+"""Append-only hand history log of Poker rounds.
+
+The log is a 16 byte header followed by one fixed-size record per round, so it can be memory-mapped as a NumPy
+structured array and queried without reading it into memory. Card slots hold card ids (0-51) and EMPTY when the
+card was never dealt, e.g. the river of a round that ended with a fold.
+"""
+import os
+import numpy as np
+from cardlib import HandValue
+
+MAGIC = b'POKERLOG'
+HEADER_SIZE = 16  # MAGIC, the format version and the number of players, as little-endian uint32
+VERSION = 1
+EMPTY = 0xFF
+
+
+def history_dtype(players):
+    """ Returns the record type of one round with the given number of players """
+    return np.dtype([('holes', 'u1', (players, 2)), ('board', 'u1', 5), ('handtypes', 'u1', players),
+                     ('winner', 'i1'), ('showdown', '?'), ('bets', '<f4', players), ('pot', '<f4')])
+
+
+class HandHistoryWriter(object):
+    """ Appends rounds to a hand history log. Rounds are collected in a buffer and written buffer_rounds at a time,
+        so recording a round only copies a few bytes. Call flush or close (or use it in a with block) to write the
+        rest.
+
+    :param filename: the log file, created with a header if it doesn't exist. A partly written record at its end is
+        removed
+    :param players: number of players in each round
+    :param buffer_rounds: number of rounds kept in memory before they are written
+    """
+
+    def __init__(self, filename, players=2, buffer_rounds=1024):
+        self.filename = filename
+        self.players = players
+        self.buffer = np.zeros(buffer_rounds, dtype=history_dtype(players))
+        self.buffered = 0
+        new = not os.path.exists(filename) or os.path.getsize(filename) == 0
+        if not new:
+            if _read_header(filename) != players:
+                raise ValueError(f"{filename} is a log of rounds with a different number of players")
+            # Cut off a record that was only partly written, otherwise every round appended after it is misaligned
+            whole = (os.path.getsize(filename) - HEADER_SIZE) // self.buffer.itemsize
+            os.truncate(filename, HEADER_SIZE + whole * self.buffer.itemsize)
+        self.file = open(filename, 'ab')
+        if new:
+            self.file.write(MAGIC + np.array([VERSION, players], dtype='<u4').tobytes())
+            self.file.flush()
+
+    def record_round(self, holes, board, handtypes, winner, bets, pot, showdown=True):
+        """ Adds a finished round to the log.
+
+        :param holes: each player's hole card ids
+        :param board: the table card ids
+        :param handtypes: each player's HandValue with the table cards that were dealt
+        :param winner: index of the player that won the pot, -1 if it was split
+        :param bets: the amount each player put in the pot
+        :param pot: the pot that was won
+        :param showdown: False if the round ended with a fold
+        """
+        record = self.buffer[self.buffered]
+        record['holes'] = EMPTY
+        for player, hole in enumerate(holes):
+            record['holes'][player, :len(hole)] = hole
+        record['board'] = EMPTY
+        record['board'][:len(board)] = board
+        record['handtypes'] = [int(handtype) for handtype in handtypes]
+        record['winner'] = winner
+        record['showdown'] = showdown
+        record['bets'] = bets
+        record['pot'] = pot
+        self.buffered += 1
+        if self.buffered == len(self.buffer):
+            self.flush()
+
+    def flush(self):
+        self.file.write(self.buffer[:self.buffered].tobytes())
+        self.file.flush()
+        self.buffered = 0
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _read_header(filename):
+    """ Checks the header of a log and returns its number of players """
+    with open(filename, 'rb') as file:
+        header = file.read(HEADER_SIZE)
+    if len(header) != HEADER_SIZE or header[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{filename} is not a hand history log")
+    version, players = np.frombuffer(header[len(MAGIC):], dtype='<u4')
+    if version != VERSION:
+        raise ValueError(f"{filename} has version {version} of the log format, expected {VERSION}")
+    return int(players)
+
+
+class HandHistory(object):
+    """ Read-only view of a hand history log. rounds is a memory-mapped structured array, so queries only read the
+        fields they use. A record that is only partly written at the end of the log is left out.
+
+    :param filename: the log file
+    """
+
+    def __init__(self, filename):
+        self.players = _read_header(filename)
+        dtype = history_dtype(self.players)
+        count = (os.path.getsize(filename) - HEADER_SIZE) // dtype.itemsize
+        if count:
+            self.rounds = np.memmap(filename, dtype=dtype, mode='r', offset=HEADER_SIZE, shape=(count,))
+        else:
+            self.rounds = np.zeros(0, dtype=dtype)
+
+    def __len__(self):
+        return len(self.rounds)
+
+    def win_rate_by_category(self, showdown_only=True):
+        """ Returns how often each hand category won the pot, over all players.
+
+        :param showdown_only: only count rounds that went to showdown
+        :return: dict from HandValue to (number of hands, fraction won, fraction split)
+        """
+        rounds = self.rounds[self.rounds['showdown']] if showdown_only else self.rounds
+        handtypes = np.asarray(rounds['handtypes'])
+        winner = np.asarray(rounds['winner'])[:, None]
+        won = winner == np.arange(self.players)
+        split = np.broadcast_to(winner == -1, handtypes.shape)
+        result = {}
+        for handtype in HandValue:
+            is_type = handtypes == handtype
+            hands = int(is_type.sum())
+            if hands:
+                result[handtype] = (hands, float(won[is_type].sum() / hands), float(split[is_type].sum() / hands))
+        return result
+
+    def pot_distribution(self, bins=20):
+        """ Returns a histogram of the pot sizes as (counts, bin edges), like np.histogram """
+        return np.histogram(self.rounds['pot'], bins=bins)
+
+    def close(self):
+        # Dropping the memory map closes the file
+        self.rounds = None
@@ -1,4 +1,7 @@
-from pokerview import *
+from PyQt5.QtWidgets import QApplication
+from pokermodel import Poker
+from pokerview import MainWindow
+from history import HandHistoryWriter
 import sys
 
 """Main file that runs the game (initializes the GUI, logic and carlib library)"""
@@ -6,10 +9,11 @@ import sys
 
 def main():
     qt_app = QApplication(sys.argv)
-    model = Poker(["Niclas", "Maithri"], 100)
-    w = MainWindow(model)
-    w.show()
-    qt_app.exec_()
+    with HandHistoryWriter("hand_history.bin") as history:
+        model = Poker(["Niclas", "Maithri"], 100, history=history)
+        w = MainWindow(model)
+        w.show()
+        qt_app.exec_()
 
 
 if __name__ == "__main__":
@@ -1,6 +1,10 @@
-from PyQt5.QtCore import *
-from PyQt5.QtGui import *
-from PyQt5.QtWidgets import *
+import sys
+if 'PyQt5.QtCore' in sys.modules:
+    # The GUI has loaded Qt already, so the model uses real Qt signals
+    from PyQt5.QtCore import QObject, pyqtSignal
+else:
+    # The model doesn't need a GUI, headless use never loads Qt
+    from signals import QObject, pyqtSignal
 import cardlib
 import abc
 
@@ -79,6 +83,7 @@ class Player(QObject):
         self.name = name
         self.credit = credit
         self.hand = HandModel()
+        self.hand_state = cardlib.HandState()  #: Hole cards plus the table cards so far, updated as cards are dealt
 
     def win(self, amount):
         pass
@@ -92,6 +97,14 @@ class Player(QObject):
     def get_credit(self):
         return str(self.credit)
 
+    def add_card(self, card):
+        self.hand.add_card(card)
+        self.hand_state.add_card(card)
+
+    def clear_hand(self):
+        self.hand.clear_hand()
+        self.hand_state = cardlib.HandState()
+
 
 class Pot(QObject):
     def __init__(self):
@@ -110,11 +123,14 @@ class Poker(QObject):
     alert = pyqtSignal(str)
     game_over = pyqtSignal()
 
-    def __init__(self, players, credit):
+    def __init__(self, players, credit, seed=None, history=None):
         super().__init__()
+        self.rng = cardlib.random_generator(seed)
+        self.history = history  # HandHistoryWriter that every finished round is recorded to, or None
         self.table_cards = TableCardsModel()
         self.pot = Pot()
         self.players = [Player(name, credit) for name in players]
+        self.bets = [0 for _ in self.players]
         self.deck = None
         self.active_player = 0
         self.inactive_player = 1
@@ -125,8 +141,9 @@ class Poker(QObject):
 
     def new_round(self):
         self.pot.clear()
-        self.deck = cardlib.StandardDeck()
-        self.deck.shuffle()
+        self.bets = [0 for _ in self.players]
+        # Same shuffle and deal order as cardlib.shuffled_decks and cardlib.deal_rounds, so simulations and games agree
+        self.deck = cardlib.StandardDeck.from_order(cardlib.shuffled_decks(1, self.rng)[0])
         self.table_cards.clear_hand()
         self.state = 0
         self.last_bet = 0
@@ -134,9 +151,9 @@ class Poker(QObject):
         self.check_player = self.active_player
 
         for player in self.players:
-            player.hand.clear_hand()
-            player.hand.add_card(self.deck.draw())
-            player.hand.add_card(self.deck.draw())
+            player.clear_hand()
+            player.add_card(self.deck.draw())
+            player.add_card(self.deck.draw())
 
         for player in self.players:
             if player.credit == 0:
@@ -155,6 +172,7 @@ class Poker(QObject):
             if self.last_bet <= self.players[self.active_player].credit:
                 self.pot.credit += self.last_bet  # Need to be larger than last bet
                 self.players[self.active_player].credit -= self.last_bet
+                self.bets[self.active_player] += self.last_bet
                 self.pot_changed.emit()
                 self.player_credit_changed.emit()
                 if self.players[self.active_player].credit == 0 and self.players[self.inactive_player].credit == 0:  # both players All-in
@@ -180,6 +198,7 @@ class Poker(QObject):
         if bet <= self.players[self.active_player].credit:
             self.pot.credit += bet
             self.players[self.active_player].credit -= bet
+            self.bets[self.active_player] += bet
             self.last_bet = bet - self.last_bet
             self.next_player()
             self.pot_changed.emit()
@@ -191,6 +210,7 @@ class Poker(QObject):
     def fold(self):
         self.players[self.inactive_player].credit += self.pot.credit
         self.player_credit_changed.emit()
+        self.record_round(self.inactive_player, showdown=False)
         self.new_round()
 
     def check(self):
@@ -217,18 +237,32 @@ class Poker(QObject):
         else:
             self.evaluate()
 
+    def record_round(self, winner, showdown=True):
+        # Called when a round is over, before new_round clears the cards and the pot
+        if self.history is not None:
+            self.history.record_round([player.hand.ids for player in self.players], self.table_cards.ids,
+                                      [player.hand_state.handtype for player in self.players], winner, self.bets,
+                                      self.pot.credit, showdown)
+
+    def deal_table_card(self):
+        # Every player's hand state gets the new card too, so their best hand is always up to date
+        card = self.deck.draw()
+        self.table_cards.add_card(card)
+        for player in self.players:
+            player.hand_state.add_card(card)
+
     def flopp(self):
-        self.table_cards.add_card(self.deck.draw())
-        self.table_cards.add_card(self.deck.draw())
-        self.table_cards.add_card(self.deck.draw())
+        self.deal_table_card()
+        self.deal_table_card()
+        self.deal_table_card()
         self.check_player = self.inactive_player
 
     def turn(self):
-        self.table_cards.add_card(self.deck.draw())
+        self.deal_table_card()
         self.check_player = self.inactive_player
 
     def river(self):
-        self.table_cards.add_card(self.deck.draw())
+        self.deal_table_card()
         self.check_player = self.inactive_player
 
     def next_player(self):
@@ -243,19 +277,19 @@ class Poker(QObject):
         return self.pot.credit
 
     def evaluate(self):
-        players_ph = []
-        for player in self.players:
-            players_ph.append(player.hand.best_poker_hand(self.table_cards.cards))
+        players_ph = [player.hand_state for player in self.players]
 
         if players_ph[0] < players_ph[1]:
             self.players[1].credit += self.pot.credit
             self.player_credit_changed.emit()
+            self.record_round(1)
             self.alert.emit(f"Maithri won with {players_ph[1].handtype.name} over Niclas {players_ph[0].handtype.name}")
             self.new_round()
 
         elif players_ph[0] > players_ph[1]:
             self.players[0].credit += self.pot.credit
             self.player_credit_changed.emit()
+            self.record_round(0)
             self.alert.emit(f"Niclas won with {players_ph[0].handtype.name} over Maithris {players_ph[1].handtype.name}")
             self.new_round()
 
@@ -263,8 +297,9 @@ class Poker(QObject):
             self.players[0].credit += self.pot.credit / 2
             self.players[1].credit += self.pot.credit / 2
             self.player_credit_changed.emit()
+            self.record_round(-1)
             self.alert.emit(f"Pot splitted between players\nBoth player with hand {players_ph[0].handtype.name} and"
-                            f" same high-card")
+                            f" same kickers")
             self.new_round()
 
 
@@ -1,3 +1,6 @@
+from PyQt5.QtCore import *
+from PyQt5.QtGui import *
+from PyQt5.QtWidgets import *
 from PyQt5.QtSvg import *
 from pokermodel import *
 
@@ -0,0 +1,43 @@
+"""Stand-ins for QObject and pyqtSignal, used by pokermodel unless Qt was imported before it (as pokerview and
+pokergame do), so the game logic can run headless without loading Qt, e.g. in simulations and bots. Signals are
+declared on the class like pyqtSignal and support connect, disconnect and emit.
+"""
+
+
+class QObject(object):
+    def __init__(self, parent=None):
+        self.parent = parent
+
+
+class pyqtSignal(object):
+    """ Signal declared as a class attribute, every instance gets its own list of connected slots """
+
+    def __init__(self, *types):
+        self.types = types
+        self.name = None
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        return instance.__dict__.setdefault('_signal_' + self.name, BoundSignal())
+
+
+class BoundSignal(object):
+    def __init__(self):
+        self.slots = []
+
+    def connect(self, slot):
+        self.slots.append(slot)
+
+    def disconnect(self, slot=None):
+        if slot is None:
+            self.slots.clear()
+        else:
+            self.slots.remove(slot)
+
+    def emit(self, *args):
+        for slot in list(self.slots):
+            slot(*args)
@@ -0,0 +1,101 @@
+import os
+import pytest
+from cardlib import HandValue
+from history import HandHistoryWriter, HandHistory, history_dtype, EMPTY, HEADER_SIZE
+from pokermodel import Poker
+
+
+def test_hand_history(tmp_path):
+    filename = str(tmp_path / 'rounds.log')
+    record_size = history_dtype(2).itemsize
+    with HandHistoryWriter(filename, buffer_rounds=2) as writer:
+        writer.record_round([[0, 1], [2, 3]], [10, 20, 30, 40, 50], [HandValue.one_pair, HandValue.flush], 1,
+                            [10, 10], 20)
+        assert os.path.getsize(filename) == HEADER_SIZE
+        writer.record_round([[4, 5], [6, 7]], [11, 21, 31], [HandValue.one_pair, HandValue.high_card], 0,
+                            [5, 0], 5, showdown=False)
+        # The buffer was full, so both rounds are written
+        assert os.path.getsize(filename) == HEADER_SIZE + 2 * record_size
+        writer.record_round([[8, 9], [12, 13]], [14, 24, 34, 44, 51], [HandValue.one_pair, HandValue.one_pair], -1,
+                            [30, 30], 60)
+    assert os.path.getsize(filename) == HEADER_SIZE + 3 * record_size
+
+    # A round that was cut off while it was written is left out, and is removed before new rounds are appended
+    with open(filename, 'ab') as file:
+        file.write(b'\x01' * (record_size // 2))
+    assert len(HandHistory(filename)) == 3
+    with HandHistoryWriter(filename, buffer_rounds=2) as writer:
+        writer.record_round([[15, 16], [17, 18]], [19, 22, 23], [HandValue.high_card, HandValue.one_pair], 1,
+                            [3, 0], 3, showdown=False)
+    assert os.path.getsize(filename) == HEADER_SIZE + 4 * record_size
+    history = HandHistory(filename)
+    assert len(history) == 4
+    assert history.rounds['holes'][3].tolist() == [[15, 16], [17, 18]]
+    assert history.rounds['winner'][3] == 1 and history.rounds['pot'][3] == 3
+    assert history.rounds['holes'][1].tolist() == [[4, 5], [6, 7]]
+    assert history.rounds['board'][1].tolist() == [11, 21, 31, EMPTY, EMPTY]
+    assert history.rounds['winner'].tolist() == [1, 0, -1, 1]
+    assert history.rounds['showdown'].tolist() == [True, False, True, False]
+    assert history.rounds['pot'].tolist() == [20, 5, 60, 3]
+
+    assert history.win_rate_by_category() == {
+        HandValue.one_pair: (3, pytest.approx(0), pytest.approx(2 / 3)),
+        HandValue.flush: (1, pytest.approx(1), pytest.approx(0)),
+    }
+    assert history.win_rate_by_category(showdown_only=False)[HandValue.high_card] == (2, 0, 0)
+    assert history.win_rate_by_category(showdown_only=False)[HandValue.one_pair][:2] == (5, pytest.approx(2 / 5))
+
+    counts, edges = history.pot_distribution(bins=4)
+    assert counts.tolist() == [2, 1, 0, 1]
+    assert edges[0] == 3 and edges[-1] == 60
+    history.close()
+
+    with pytest.raises(ValueError):
+        HandHistoryWriter(filename, players=3)
+
+
+def test_poker_history(tmp_path):
+    filename = str(tmp_path / 'game.log')
+    with HandHistoryWriter(filename, buffer_rounds=1) as writer:
+        poker = Poker(['Niclas', 'Maithri'], 100, seed=3, history=writer)
+
+        # A round that ends with a fold before the flop
+        holes = [list(player.hand.ids) for player in poker.players]
+        raiser = poker.active_player
+        poker.raise_bet(5)
+        poker.fold()
+
+        # A round that goes to showdown
+        holes.extend(list(player.hand.ids) for player in poker.players)
+        poker.raise_bet(10)
+        poker.call()
+        while poker.state < 3 or len(poker.table_cards.cards) < 5:
+            poker.check()
+            poker.check()
+        board = list(poker.table_cards.ids)
+        states = [player.hand_state for player in poker.players]
+        bets = list(poker.bets)
+        poker.check()
+        poker.check()
+
+    history = HandHistory(filename)
+    assert len(history) == 2
+    fold, showdown = history.rounds
+    assert not fold['showdown']
+    assert fold['winner'] == raiser
+    assert fold['holes'].tolist() == holes[:2]
+    assert fold['board'].tolist() == [EMPTY] * 5
+    assert fold['bets'][raiser] == 5 and fold['bets'].sum() == 5
+    assert fold['pot'] == 5
+
+    assert showdown['showdown']
+    assert showdown['holes'].tolist() == holes[2:]
+    assert showdown['board'].tolist() == board
+    assert showdown['handtypes'].tolist() == [int(state.handtype) for state in states]
+    if states[0] == states[1]:
+        assert showdown['winner'] == -1
+    else:
+        assert showdown['winner'] == int(states[1] > states[0])
+    assert showdown['bets'].tolist() == bets == [10, 10]
+    assert showdown['pot'] == 20
+    history.close()
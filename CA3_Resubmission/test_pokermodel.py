@@ -0,0 +1,22 @@
+import cardlib
+from pokermodel import Poker
+
+
+def test_seeded_deal():
+    # A seeded game deals the same cards as the simulations in cardlib with that seed
+    for seed in (0, 41, 2024):
+        poker = Poker(['Niclas', 'Maithri'], 100, seed=seed)
+        deal = cardlib.deal_rounds(cardlib.shuffled_decks(1, seed), 2)
+        assert [list(player.hand.ids) for player in poker.players] == deal.holes[0].tolist()
+
+        poker.raise_bet(10)
+        poker.call()
+        assert list(poker.table_cards.ids) == deal.flop[0].tolist()
+        poker.check()
+        poker.check()
+        poker.check()
+        poker.check()
+        assert list(poker.table_cards.ids) == deal.flop[0].tolist() + [deal.turn[0], deal.river[0]]
+
+    assert [list(player.hand.ids) for player in Poker(['Niclas', 'Maithri'], 100, seed=41).players] == \
+        [list(player.hand.ids) for player in Poker(['Niclas', 'Maithri'], 100, seed=41).players]